@@ -1,8 +1,11 @@
-import matplotlib.pyplot as plt
+import argparse
 import shutil
 import os
+import batch
+import benchmark
+import outer_face_search
 from io_graph_functions import save_to_file, read_from_file, draw_graph, write_graph_format_txt, load_graph_from_format_txt,save_graph_pic_to_file
-from instances_preliminaries import generate_triangulated_graph, get_canonical_ordering
+from instances_preliminaries import generate_triangulated_graph, generate_triangulation, get_canonical_ordering, prepare_instance, evict_prepared_instance
 from shift_algorithm import combinatorial_embedding_to_pos
 from graph_algorithms import AAlgorithm,BAlgorithm, GraphDrawingAlgorithm
 import time
@@ -17,25 +20,26 @@ def run_instance(instance_id, g, ordering=None):
     algA = AAlgorithm()
     algB = BAlgorithm()
 
-    posAlgA = algA.run(g, debug=True, ordering=ordering, output_path=path)
-    posAlgb = algB.run(g, debug=True, ordering=ordering, output_path=path)
+    # planarity test and canonical ordering are shared by all algorithms
+    instance = prepare_instance(g)
+    posAlgA = algA.run(instance, debug=True, ordering=ordering, output_path=path)
+    posAlgb = algB.run(instance, debug=True, ordering=ordering, output_path=path)
 
-    posShift = combinatorial_embedding_to_pos(g)
+    posShift = combinatorial_embedding_to_pos(instance)
 
-    plt.clf()
     save_graph_pic_to_file(g, '{path}/aalgorithm.png'.format(path=path),pos=posAlgA)
     write_graph_format_txt(g, posAlgA, '{path}/{instance_id}_aalgorithm.txt'.format(path=path, instance_id=instance_id))
 
     save_graph_pic_to_file(g, '{path}/comparison_shift.png'.format(path=path), pos=posShift, color='red')
     write_graph_format_txt(g, posShift, '{path}/{instance_id}_shift.txt'.format(path=path, instance_id=instance_id))
 
-    plt.clf()
     save_graph_pic_to_file(g, '{path}/shift.png'.format(path=path), pos=posShift)
 
-    plt.clf()
     save_graph_pic_to_file(g, '{path}/balgorithm.png'.format(path=path), pos=posAlgb)
     write_graph_format_txt(g, posAlgb, '{path}/{instance_id}_balgorithm.txt'.format(path=path, instance_id=instance_id))
 
+    evict_prepared_instance(g)
+
 
 def main():
     # clear instances data from before
@@ -63,6 +67,50 @@ def main():
 
     return
 
-start_time = time.time()
-main()
-print("--- %s seconds ---" % (time.time() - start_time))
\ No newline at end of file
+# Narrowest drawings over outer faces of a random triangulation, compared with the default outer face
+def run_outer_face_search(size, seed, workers, max_candidates):
+    instance = generate_triangulation(size, seed).instance()
+    for name, algorithm in (('aalgorithm', AAlgorithm), ('balgorithm', BAlgorithm)):
+        default = algorithm().run(instance)
+        result = outer_face_search.search_outer_face(instance, algorithm, workers, max_candidates, seed)
+        print('{name}: default outer face width {default}, best {width} (outer face {outer_face}, height {height}), '
+              '{aborted} of {candidates} candidates aborted'.format(
+                  name=name, default=default.width(), width=result.width, outer_face=result.outer_face,
+                  height=result.height, aborted=result.aborted, candidates=result.candidates))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Minimum-width grid graph drawing algorithms')
+    parser.add_argument('--batch', type=int, help='number of random triangulations to run in batch mode')
+    parser.add_argument('--min-size', type=int, default=10, help='smallest number of nodes in batch mode')
+    parser.add_argument('--max-size', type=int, default=100, help='largest number of nodes in batch mode')
+    parser.add_argument('--instances', help='directory of stored instances to run in batch mode')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first generated instance')
+    parser.add_argument('--workers', type=int, help='number of worker processes, all cores by default')
+    parser.add_argument('--chunk-size', type=int, default=4, help='instances sent to a worker at once')
+    parser.add_argument('--results', default='results.jsonl', help='aggregated results file of batch mode')
+    parser.add_argument('--validate', action='store_true', help='check that every drawing of batch mode is planar')
+    parser.add_argument('--benchmark', action='store_true', help='time the phases of all algorithms over a ladder of sizes')
+    parser.add_argument('--sizes', type=int, nargs='+', help='instance sizes of the benchmark, 10^2 to 10^6 by default')
+    parser.add_argument('--repeat', type=int, default=1, help='instances of every size in the benchmark')
+    parser.add_argument('--trace-memory', action='store_true', help='record peak memory of every benchmark phase')
+    parser.add_argument('--outer-face-search', type=int, help='search the narrowest outer face of a random triangulation of this size')
+    parser.add_argument('--max-candidates', type=int, help='outer faces tried by the search, all by default')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    start_time = time.time()
+    if args.outer_face_search is not None:
+        run_outer_face_search(args.outer_face_search, args.seed, args.workers, args.max_candidates)
+    elif args.benchmark:
+        tasks = benchmark.benchmark_tasks(args.sizes, args.repeat, args.seed, args.trace_memory)
+        benchmark.run_benchmark(tasks, args.results, args.workers or 1)
+    elif args.instances is not None:
+        batch.run_batch(batch.stored_tasks(args.instances), args.results, args.workers, args.chunk_size, args.validate)
+    elif args.batch is not None:
+        tasks = batch.generated_tasks(args.batch, args.min_size, args.max_size, args.seed)
+        batch.run_batch(tasks, args.results, args.workers, args.chunk_size, args.validate)
+    else:
+        main()
+    print("--- %s seconds ---" % (time.time() - start_time))
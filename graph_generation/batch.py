@@ -0,0 +1,106 @@
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import instances_preliminaries
+import instance_store
+from drawing_validation import find_violation, violation_message
+from graph_algorithms import AAlgorithm, BAlgorithm
+from shift_algorithm import combinatorial_embedding_to_pos
+
+# Batch runs of all algorithms over many instances in a process pool.
+# Workers only compute layouts, results are streamed by the parent into one JSON-lines file.
+
+INSTANCE_EXTENSION = '.inst'
+
+
+def run_aalgorithm(instance):
+    return AAlgorithm().run(instance)
+
+
+def run_balgorithm(instance):
+    return BAlgorithm().run(instance)
+
+
+BATCH_ALGORITHMS = [
+    ('aalgorithm', run_aalgorithm),
+    ('balgorithm', run_balgorithm),
+    ('shift', combinatorial_embedding_to_pos),
+]
+
+
+def drawing_size(pos):
+    xs = [x for x, _ in pos.values()]
+    ys = [y for _, y in pos.values()]
+    return max(xs) - min(xs), max(ys) - min(ys)
+
+
+# Tasks for count random triangulations with sizes in [min_size, max_size].
+# Every instance has its own seed, so results do not depend on how tasks are spread over workers.
+def generated_tasks(count, min_size, max_size, seed=0):
+    tasks = []
+    for i in range(count):
+        instance_seed = seed + i
+        size = random.Random(instance_seed).randint(min_size, max_size)
+        tasks.append({'instance_id': 'graph_{i}'.format(i=i), 'size': size, 'seed': instance_seed})
+    return tasks
+
+
+# Tasks for instance files (see instance_store) in directory.
+def stored_tasks(directory):
+    tasks = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(INSTANCE_EXTENSION):
+            tasks.append({'instance_id': name[:-len(INSTANCE_EXTENSION)], 'path': os.path.join(directory, name)})
+    return tasks
+
+
+def load_task_instance(task):
+    if 'path' in task:
+        return instance_store.open_instance(task['path'])
+
+    # generated triangulations come with embedding and canonical ordering, no planarity test is run
+    return instances_preliminaries.generate_triangulation(task['size'], task['seed']).instance()
+
+
+# validate - check every drawing with the sweep-line validator, the first violation is stored in the result
+def run_task(task, validate=False):
+    result = dict(task)
+    start_time = time.time()
+    instance = load_task_instance(task)
+    # planarity test and canonical ordering are timed separately from the algorithms
+    result['n'] = len(instance.ordering)
+    result['prepare_time'] = time.time() - start_time
+
+    for name, algorithm in BATCH_ALGORITHMS:
+        start_time = time.time()
+        try:
+            pos = algorithm(instance)
+        except Exception as e:
+            result[name] = {'error': repr(e)}
+            continue
+        width, height = drawing_size(pos)
+        result[name] = {'width': width, 'height': height, 'time': time.time() - start_time}
+        if validate:
+            violation = find_violation(instance.g, pos)
+            result[name]['violation'] = None if violation is None else violation_message(violation)
+
+    return result
+
+
+def run_chunk(tasks, validate=False):
+    return [run_task(task, validate) for task in tasks]
+
+
+# Running tasks in a pool of workers, chunk_size tasks are sent to a worker at once.
+# Results are written to results_path as soon as a chunk is finished, one JSON object per line.
+def run_batch(tasks, results_path, workers=None, chunk_size=4, validate=False):
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+    with open(results_path, 'w') as f, ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_chunk, chunk, validate) for chunk in chunks]
+        for future in as_completed(futures):
+            for result in future.result():
+                f.write(json.dumps(result) + '\n')
+            f.flush()
@@ -0,0 +1,108 @@
+import json
+import platform
+import resource
+import time
+import tracemalloc
+from multiprocessing import Pool
+
+import instances_preliminaries
+from batch import drawing_size
+from graph_algorithms import AAlgorithm, BAlgorithm
+from shift_algorithm import combinatorial_embedding_to_pos
+
+# Benchmark of the drawing algorithms over a ladder of instance sizes.
+# Every (size, seed) task runs in its own worker process, so peak_rss is the peak of that task alone.
+# Phases are timed separately: generating the graph, planarity test (embedding), canonical ordering, ZTable,
+# the phases of AAlgorithm / BAlgorithm recorded in phase_times and combinatorial_embedding_to_pos.
+# With trace_memory the peak of Python allocations made during a phase is recorded for every phase as well
+# (slower). Tracing is restarted before each phase, memory allocated by earlier phases is not counted.
+# Results are written as JSON lines, one object per task.
+
+BENCHMARK_SIZES = [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+
+BENCHMARK_ALGORITHMS = [
+    ('aalgorithm', AAlgorithm),
+    ('balgorithm', BAlgorithm),
+]
+
+
+class PhaseRecorder:
+    # Time and, with trace_memory, peak traced memory of the phases of one task
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.times = dict()
+        self.memory = dict()
+
+    def measure(self, name, function, *args):
+        if self.trace_memory:
+            tracemalloc.stop()
+            tracemalloc.start()
+        start_time = time.perf_counter()
+        value = function(*args)
+        self.times[name] = time.perf_counter() - start_time
+        if self.trace_memory:
+            self.memory[name] = tracemalloc.get_traced_memory()[1]
+        return value
+
+
+def benchmark_tasks(sizes=None, repeat=1, seed=0, trace_memory=False):
+    tasks = []
+    for size in BENCHMARK_SIZES if sizes is None else sizes:
+        for i in range(repeat):
+            tasks.append({'size': size, 'seed': seed + i, 'trace_memory': trace_memory})
+    return tasks
+
+
+def run_benchmark_task(task):
+    result = dict(task)
+    phases = PhaseRecorder(task['trace_memory'])
+
+    g = phases.measure('generate', instances_preliminaries.generate_triangulated_graph, task['size'], task['seed'])
+    instance = instances_preliminaries.PreparedInstance(g)
+    phases.measure('embedding', lambda: instance.embedding)
+    phases.measure('canonical_ordering', lambda: instance.ordering)
+    phases.measure('z_table', lambda: instance.z_table)
+    result['n'] = len(instance.ordering)
+
+    for name, algorithm in BENCHMARK_ALGORITHMS:
+        alg = algorithm()
+        try:
+            pos = phases.measure(name, alg.run, instance)
+        except Exception as e:
+            result[name] = {'error': repr(e)}
+            continue
+        result[name] = {'width': pos.width(), 'height': pos.height(), 'time': phases.times[name],
+                        'phases': alg.phase_times}
+        if phases.trace_memory:
+            result[name]['peak_memory'] = phases.memory[name]
+
+    try:
+        pos = phases.measure('shift', combinatorial_embedding_to_pos, instance)
+        width, height = drawing_size(pos)
+        result['shift'] = {'width': width, 'height': height, 'time': phases.times['shift']}
+    except Exception as e:
+        result['shift'] = {'error': repr(e)}
+
+    result['phases'] = phases.times
+    if phases.trace_memory:
+        result['peak_memory'] = phases.memory
+        tracemalloc.stop()
+    # ru_maxrss is in KiB on Linux
+    result['peak_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return result
+
+
+# Running benchmark tasks, a fresh worker process for every task. One worker by default, so tasks
+# do not compete for cores and memory bandwidth. Results are written to results_path as they finish.
+def run_benchmark(tasks, results_path, workers=1):
+    environment = {'python': platform.python_version(), 'machine': platform.machine(), 'processor': platform.processor()}
+    with open(results_path, 'w') as f, Pool(processes=workers, maxtasksperchild=1) as pool:
+        for result in pool.imap(run_benchmark_task, tasks):
+            result['environment'] = environment
+            f.write(json.dumps(result) + '\n')
+            f.flush()
+            times = ', '.join('{name} {time}'.format(name=name, time='error' if 'error' in result[name] else
+                                                     '{:.3f} s'.format(result[name]['time']))
+                              for name in ['aalgorithm', 'balgorithm', 'shift'])
+            print('size {size}, seed {seed}: {times}'.format(size=result['size'], seed=result['seed'], times=times))
@@ -0,0 +1,79 @@
+import numpy as np
+
+UNDEFINED = -1
+
+
+class CanonicalOrdering:
+    # Canonical ordering kept in flat integer arrays instead of a list of (vk, wp_wq) tuples.
+    # order[k]           - v_k
+    # contour_offsets    - contour neighbours of v_k are contour_nodes[contour_offsets[k]:contour_offsets[k+1]]
+    # rank[v]            - k such that order[k] == v, UNDEFINED for ids that are not in the ordering
+    # vertex(k) and contour_neighbors(k) read v_k and a view of its contour neighbours without building anything,
+    # ordering[k] still gives the tuple (v_k, [wp, ..., wq]) for callers written for the list of tuples.
+
+    def __init__(self, order, contour_offsets, contour_nodes, rank=None):
+        self.order = order
+        self.contour_offsets = contour_offsets
+        self.contour_nodes = contour_nodes
+
+        if rank is None:
+            rank = np.full(int(order.max()) + 1 if len(order) > 0 else 0, UNDEFINED, dtype=np.int32)
+            rank[order] = np.arange(len(order), dtype=np.int32)
+        self.rank = rank
+
+    # Pickled as the three arrays only (e.g. for worker processes), rank is rebuilt from order
+    def __reduce__(self):
+        return CanonicalOrdering, (np.asarray(self.order), np.asarray(self.contour_offsets),
+                                   np.asarray(self.contour_nodes))
+
+    # v_k as int
+    def vertex(self, k):
+        return int(self.order[k])
+
+    # Contour neighbours of kth vertex as array, without building a list
+    def contour_neighbors(self, k):
+        return self.contour_nodes[self.contour_offsets[k]:self.contour_offsets[k + 1]]
+
+    def __getitem__(self, k):
+        if k < 0:
+            k += len(self.order)
+        return int(self.order[k]), self.contour_neighbors(k).tolist()
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        for k in range(len(self.order)):
+            yield self[k]
+
+
+# Converting ordering given as list of (vk, wp_wq) tuples to CanonicalOrdering.
+def ordering_from_tuples(ordering):
+    order = np.fromiter((v for v, _ in ordering), dtype=np.int32, count=len(ordering))
+    contour_offsets = np.zeros(len(ordering) + 1, dtype=np.int64)
+    contour_offsets[1:] = np.cumsum([len(wp_wq) for _, wp_wq in ordering])
+    contour_nodes = np.fromiter((w for _, wp_wq in ordering for w in wp_wq), dtype=np.int32,
+                                count=int(contour_offsets[-1]))
+    return CanonicalOrdering(order, contour_offsets, contour_nodes)
+
+
+# Ordering as CanonicalOrdering, converting list of tuples (e.g. dummy ordering) if needed.
+def as_canonical_ordering(ordering):
+    if isinstance(ordering, CanonicalOrdering):
+        return ordering
+    return ordering_from_tuples(ordering)
+
+
+# Ordering with integer nodes as (CanonicalOrdering, None). Orderings of graphs with other nodes (e.g. strings)
+# are relabelled to 0, ..., n-1 in the order of the ordering, as (CanonicalOrdering, labels) where labels[i]
+# is the node relabelled to i.
+def as_integer_ordering(ordering):
+    if isinstance(ordering, CanonicalOrdering):
+        return ordering, None
+    if all(isinstance(v, (int, np.integer)) and v >= 0 for v, _ in ordering):
+        return ordering_from_tuples(ordering), None
+
+    labels = [v for v, _ in ordering]
+    index = dict((v, i) for i, v in enumerate(labels))
+    relabelled = [(index[v], [index[w] for w in wp_wq]) for v, wp_wq in ordering]
+    return ordering_from_tuples(relabelled), labels
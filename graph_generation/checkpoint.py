@@ -0,0 +1,276 @@
+import os
+
+import numpy as np
+
+from coordinates import CoordinateStore
+from contour import Contour
+from domino_chains import DominoChains
+from errors import InstanceFormatError
+from shift_engine import RelativeShiftEngine
+from u_sets import USetForest
+
+UNDEFINED = -1
+# dom and stable of vertices without a value
+MISSING = -2
+
+# Checkpoint file of a drawing algorithm run, state after inserting v_k, so the run can go on from k + 1.
+# The file is a magic followed by records, appended every `every` insertions. The first record has every
+# section in full, later records only the entries that changed since the previous record (indices and values).
+# Sections that do not change after init_calculations (domino chains, U-set forest) are only in the first record.
+# Record: int64 header [payload bytes, k, number of sections], then for every section int64
+# [section index, kind, count, 0] and its data, all aligned to 8 bytes. A record cut off by a crash is ignored.
+CHECKPOINT_MAGIC = b'GDCKPT01'
+CHECKPOINT_SCALARS = ['count', 'min_x', 'max_x', 'min_y', 'max_y', 'first', 'last', 'length',
+                      'width', 'height', 'has_engine', 'root']
+CHECKPOINT_SECTIONS = [
+    ('scalars', np.int64),
+    ('x', np.int32),
+    ('y', np.int32),
+    ('placed', np.uint8),
+    ('u_offset', np.int64),
+    ('left_nbr', np.int32),
+    ('right_nbr', np.int32),
+    ('on_contour', np.uint8),
+    ('edge_slack', np.int64),
+    ('engine_placed', np.uint8),
+    ('engine_delta_x', np.int64),
+    ('engine_y', np.int64),
+    ('engine_left', np.int32),
+    ('engine_right', np.int32),
+    ('dc_parent', np.int32),
+    ('dc_depth', np.int32),
+    ('dc_nodes', np.int32),
+    ('dom', np.int32),
+    ('stable', np.int8),
+    ('u_parent', np.int32),
+    ('u_first_child', np.int32),
+    ('u_next_sibling', np.int32),
+    ('u_nodes', np.int32),
+]
+FULL = 0
+DELTA = 1
+
+
+def dict_to_array(values, size, missing):
+    array = np.full(size, missing, dtype=np.int64)
+    if values:
+        array[list(values.keys())] = list(values.values())
+    return array
+
+
+def tree_to_array(tree, size):
+    array = np.full(size, UNDEFINED, dtype=np.int64)
+    for v, child in tree.items():
+        if child is not None:
+            array[v] = child
+    return array
+
+
+# Sections of the current state of algorithm, static ones only if with_static
+def algorithm_state(algorithm, with_static=False):
+    pos = algorithm.pos
+    size = len(pos.placed)
+    contour = algorithm.contour
+    engine = algorithm.engine
+
+    state = dict()
+    state['x'] = pos.x
+    state['y'] = pos.y
+    state['placed'] = pos.placed
+    state['u_offset'] = algorithm.u_set.offset
+    state['left_nbr'] = contour.left_nbr
+    state['right_nbr'] = contour.right_nbr
+    state['on_contour'] = contour.on_contour
+    if hasattr(algorithm, 'edge_slack'):
+        state['edge_slack'] = algorithm.edge_slack
+
+    root = UNDEFINED
+    if engine is not None:
+        root = engine.root
+        state['engine_placed'] = dict_to_array(dict.fromkeys(engine.y_coordinate, 1), size, 0)
+        state['engine_delta_x'] = dict_to_array(engine.delta_x, size, 0)
+        state['engine_y'] = dict_to_array(engine.y_coordinate, size, 0)
+        state['engine_left'] = tree_to_array(engine.left_t_child, size)
+        state['engine_right'] = tree_to_array(engine.right_t_child, size)
+
+    state['scalars'] = [pos.count, pos.min_x, pos.max_x, pos.min_y, pos.max_y,
+                        contour.first, contour.last, contour.length,
+                        algorithm.width, algorithm.height, int(engine is not None), root]
+
+    if with_static:
+        state['dc_parent'] = algorithm.DC.parent
+        state['dc_depth'] = algorithm.DC.depth
+        state['dc_nodes'] = algorithm.DC.nodes
+        state['dom'] = dict_to_array(algorithm.dom, size, MISSING)
+        state['stable'] = dict_to_array(algorithm.stable, size, MISSING)
+        state['u_parent'] = algorithm.u_set.parent
+        state['u_first_child'] = algorithm.u_set.first_child
+        state['u_next_sibling'] = algorithm.u_set.next_sibling
+        state['u_nodes'] = algorithm.u_set.nodes
+
+    return dict((name, np.asarray(state[name], dtype=dtype))
+                for name, dtype in CHECKPOINT_SECTIONS if name in state)
+
+
+# Installing sections read from a checkpoint into algorithm, ordering has to be set already.
+def restore_algorithm_state(algorithm, state):
+    scalars = dict(zip(CHECKPOINT_SCALARS, state['scalars'].tolist()))
+    size = len(state['x'])
+
+    pos = CoordinateStore(size)
+    pos.x = state['x'].astype(np.int32)
+    pos.y = state['y'].astype(np.int32)
+    pos.placed = state['placed'].astype(bool)
+    pos.count = scalars['count']
+    pos.min_x, pos.max_x, pos.min_y, pos.max_y = scalars['min_x'], scalars['max_x'], scalars['min_y'], scalars['max_y']
+    algorithm.pos = pos
+    algorithm.view = pos
+
+    contour = Contour(size)
+    contour.left_nbr = state['left_nbr'].tolist()
+    contour.right_nbr = state['right_nbr'].tolist()
+    contour.on_contour = state['on_contour'].astype(bool).tolist()
+    contour.first, contour.last, contour.length = scalars['first'], scalars['last'], scalars['length']
+    algorithm.contour = contour
+
+    algorithm.DC = DominoChains(size)
+    algorithm.DC.parent = state['dc_parent'].tolist()
+    algorithm.DC.depth = state['dc_depth'].tolist()
+    algorithm.DC.nodes = state['dc_nodes'].tolist()
+    algorithm.dom = dict((v, d) for v, d in enumerate(state['dom'].tolist()) if d != MISSING)
+    algorithm.stable = dict((v, s == 1) for v, s in enumerate(state['stable'].tolist()) if s != MISSING)
+
+    algorithm.u_set = USetForest(size)
+    algorithm.u_set.parent = state['u_parent'].tolist()
+    algorithm.u_set.first_child = state['u_first_child'].tolist()
+    algorithm.u_set.next_sibling = state['u_next_sibling'].tolist()
+    algorithm.u_set.nodes = state['u_nodes'].tolist()
+    algorithm.u_set.offset = state['u_offset'].astype(np.int64)
+
+    if 'edge_slack' in state:
+        algorithm.edge_slack = state['edge_slack'].tolist()
+
+    algorithm.width = scalars['width']
+    algorithm.height = scalars['height']
+
+    if scalars['has_engine']:
+        engine = RelativeShiftEngine(algorithm.ordering)
+        placed = np.flatnonzero(state['engine_placed']).tolist()
+        delta_x = state['engine_delta_x'].tolist()
+        y = state['engine_y'].tolist()
+        left = state['engine_left'].tolist()
+        right = state['engine_right'].tolist()
+        engine.root = scalars['root']
+        engine.delta_x = dict((v, delta_x[v]) for v in placed)
+        engine.y_coordinate = dict((v, y[v]) for v in placed)
+        engine.left_t_child = dict((v, None if left[v] == UNDEFINED else left[v]) for v in placed)
+        engine.right_t_child = dict((v, None if right[v] == UNDEFINED else right[v]) for v in placed)
+        algorithm.engine = engine
+
+
+def pad(nbytes):
+    return b'\0' * ((-nbytes) % 8)
+
+
+class CheckpointWriter:
+    # Writes a record every `every` insertions. last holds copies of the sections as they are in the
+    # file, the next record is the difference against them.
+    # state - sections read back from the file when a run is resumed, None for a new file
+
+    def __init__(self, path, every, k=None, state=None, end=None):
+        self.path = path
+        self.every = every
+        self.last = state
+        self.last_k = k
+        if state is None:
+            self.f = open(path, 'wb')
+            self.f.write(CHECKPOINT_MAGIC)
+        else:
+            # drop a record cut off by a crash, new records go after the last complete one
+            self.f = open(path, 'r+b')
+            self.f.truncate(end)
+            self.f.seek(end)
+
+    # Called after every insertion, writes a record after every `every`th
+    def step(self, algorithm, k):
+        if self.last_k is None or k - self.last_k >= self.every:
+            self.write(algorithm, k)
+
+    def write(self, algorithm, k):
+        state = algorithm_state(algorithm, with_static=self.last is None)
+        if self.last is None:
+            self.last = dict()
+
+        parts = []
+        sections = 0
+        for index, (name, dtype) in enumerate(CHECKPOINT_SECTIONS):
+            if name not in state:
+                continue
+            array = state[name]
+            last = self.last.get(name)
+            if last is None or len(last) != len(array):
+                kind, count = FULL, len(array)
+                data = [array.tobytes()]
+                self.last[name] = array.copy()
+            else:
+                changed = np.flatnonzero(array != last)
+                if len(changed) == 0:
+                    continue
+                kind, count = DELTA, len(changed)
+                values = array[changed]
+                data = [changed.astype(np.int64).tobytes(), values.tobytes()]
+                last[changed] = values
+            parts.append(np.array([index, kind, count, 0], dtype=np.int64).tobytes())
+            for chunk in data:
+                parts.append(chunk)
+                parts.append(pad(len(chunk)))
+            sections += 1
+
+        payload = b''.join(parts)
+        self.f.write(np.array([len(payload), k, sections], dtype=np.int64).tobytes())
+        self.f.write(payload)
+        self.f.flush()
+        self.last_k = k
+
+    def close(self):
+        self.f.close()
+
+
+# Reading checkpoint file, returns (k, state, end) for the last complete record, end is its end offset.
+def read_checkpoint(path):
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(data[:len(CHECKPOINT_MAGIC)]) != CHECKPOINT_MAGIC:
+        raise InstanceFormatError('{path} is not a checkpoint file'.format(path=path))
+
+    state = dict()
+    k = None
+    offset = len(CHECKPOINT_MAGIC)
+    while offset + 24 <= len(data):
+        payload, record_k, sections = data[offset:offset + 24].view(np.int64).tolist()
+        if offset + 24 + payload > len(data):
+            break
+        position = offset + 24
+        for _ in range(sections):
+            index, kind, count, _ = data[position:position + 32].view(np.int64).tolist()
+            position += 32
+            name, dtype = CHECKPOINT_SECTIONS[index]
+            dtype = np.dtype(dtype)
+            if kind == FULL:
+                state[name] = data[position:position + count * dtype.itemsize].view(dtype).copy()
+                position += count * dtype.itemsize
+            else:
+                changed = data[position:position + 8 * count].view(np.int64)
+                position += 8 * count
+                state[name][changed] = data[position:position + count * dtype.itemsize].view(dtype)
+                position += count * dtype.itemsize
+            position += (-position) % 8
+        offset = position
+        k = record_k
+
+    if k is None:
+        raise InstanceFormatError('{path} has no complete checkpoint'.format(path=path))
+    return k, state, offset
+
+
+def has_checkpoint(path):
+    return path is not None and os.path.exists(path) and os.path.getsize(path) > len(CHECKPOINT_MAGIC)
@@ -0,0 +1,77 @@
+UNDEFINED = -1
+
+
+class Contour:
+    # Contour C_k of G_k, from v_1 to v_2, as a doubly linked list over vertex ids.
+    # Neighbours are kept in arrays indexed by vertex, the same idea as outer_face_cw_nbr / outer_face_ccw_nbr
+    # in inner_get_canonical_ordering, so locating a vertex, moving to its neighbours and splicing in v_k
+    # are O(1) (amortized, covered vertices leave the contour exactly once).
+    # size  - upper bound for vertex ids + 1
+    # nodes - initial contour, left to right
+
+    def __init__(self, size, nodes=()):
+        self.left_nbr = [UNDEFINED] * size
+        self.right_nbr = [UNDEFINED] * size
+        self.on_contour = [False] * size
+        self.first = UNDEFINED
+        self.last = UNDEFINED
+        self.length = 0
+
+        for v in nodes:
+            self.append(v)
+
+    def append(self, v):
+        if self.last == UNDEFINED:
+            self.first = v
+        else:
+            self.right_nbr[self.last] = v
+        self.left_nbr[v] = self.last
+        self.right_nbr[v] = UNDEFINED
+        self.on_contour[v] = True
+        self.last = v
+        self.length += 1
+
+    # Neighbour of v on the left, UNDEFINED for v_1
+    def left(self, v):
+        return self.left_nbr[v]
+
+    # Neighbour of v on the right, UNDEFINED for v_2
+    def right(self, v):
+        return self.right_nbr[v]
+
+    # Replacing the vertices strictly between wp and wq with v_k
+    def splice(self, v_k, wp, wq):
+        w = self.right_nbr[wp]
+        while w != wq:
+            self.on_contour[w] = False
+            self.length -= 1
+            w = self.right_nbr[w]
+
+        self.right_nbr[wp] = v_k
+        self.left_nbr[v_k] = wp
+        self.right_nbr[v_k] = wq
+        self.left_nbr[wq] = v_k
+        self.on_contour[v_k] = True
+        self.length += 1
+
+    # Iterating contour from v to the end (v_2)
+    def nodes_from(self, v):
+        while v != UNDEFINED:
+            yield v
+            v = self.right_nbr[v]
+
+    def __iter__(self):
+        return self.nodes_from(self.first)
+
+    def __len__(self):
+        return self.length
+
+    def __contains__(self, v):
+        return 0 <= v < len(self.on_contour) and self.on_contour[v]
+
+    # Printed as list, so debug and log output stay the same
+    def __str__(self):
+        return str(list(self))
+
+    def __repr__(self):
+        return 'Contour({nodes})'.format(nodes=list(self))
@@ -0,0 +1,138 @@
+import numpy as np
+
+
+class CoordinateStore:
+    # Coordinates of vertices in two int32 arrays indexed by vertex id, placed[v] tells if v has a position.
+    # The store behaves like the dict of (x, y) tuples the algorithms used before, store[v] is a tuple,
+    # so it can be passed to save_graph_pic_to_file, write_graph_format_txt or dict().
+    # Shifts work on whole index arrays, slices or masks at once.
+    # Bounding box is kept up to date on every write, so width() and height() are O(1). It only grows:
+    # shifting the leftmost vertex to the right would leave min_x behind, in the drawing algorithms
+    # v1 stays at x = 0 and that never happens.
+
+    def __init__(self, size):
+        self.x = np.zeros(size, dtype=np.int32)
+        self.y = np.zeros(size, dtype=np.int32)
+        self.placed = np.zeros(size, dtype=bool)
+        self.count = 0
+        self.min_x = self.max_x = self.min_y = self.max_y = None
+
+    # Store of all vertices in nodes (array) with coordinates xs, ys.
+    @classmethod
+    def from_arrays(cls, size, nodes, xs, ys):
+        store = cls(size)
+        store.set_many(nodes, xs, ys)
+        return store
+
+    def set_many(self, nodes, xs, ys):
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if len(nodes) == 0:
+            return
+        self.x[nodes] = xs
+        self.y[nodes] = ys
+        self.count += len(nodes) - int(np.count_nonzero(self.placed[nodes]))
+        self.placed[nodes] = True
+        self.extend_bounds(int(self.x[nodes].min()), int(self.x[nodes].max()),
+                           int(self.y[nodes].min()), int(self.y[nodes].max()))
+
+    def extend_bounds(self, min_x, max_x, min_y, max_y):
+        if self.min_x is None:
+            self.min_x, self.max_x, self.min_y, self.max_y = min_x, max_x, min_y, max_y
+            return
+        self.min_x = min(self.min_x, min_x)
+        self.max_x = max(self.max_x, max_x)
+        self.min_y = min(self.min_y, min_y)
+        self.max_y = max(self.max_y, max_y)
+
+    # Moving nodes (vertex, index array, slice or mask) by dx to the right
+    def shift(self, nodes, dx=1):
+        self.x[nodes] += dx
+        if np.size(nodes) > 0:
+            self.max_x = max(self.max_x, int(self.x[nodes].max()))
+
+    # Copy of the store with x moved by dx, array indexed by vertex id
+    def shifted(self, dx):
+        store = CoordinateStore(0)
+        store.x = self.x + np.asarray(dx, dtype=np.int32)
+        store.y = self.y.copy()
+        store.placed = self.placed.copy()
+        store.count = self.count
+        if self.count > 0:
+            xs = store.x[store.placed]
+            store.min_x, store.max_x = int(xs.min()), int(xs.max())
+            store.min_y, store.max_y = self.min_y, self.max_y
+        return store
+
+    # Positions of nodes as a small dict, read with one gather instead of per vertex
+    def frame(self, nodes):
+        index = np.array(nodes)
+        return dict(zip(nodes, zip(self.x[index].tolist(), self.y[index].tolist())))
+
+    def width(self):
+        return 0 if self.count == 0 else self.max_x - self.min_x
+
+    def height(self):
+        return 0 if self.count == 0 else self.max_y - self.min_y
+
+    def __setitem__(self, v, position):
+        x, y = position
+        if not self.placed[v]:
+            self.placed[v] = True
+            self.count += 1
+        self.x[v] = x
+        self.y[v] = y
+        if self.min_x is None:
+            self.min_x, self.max_x, self.min_y, self.max_y = x, x, y, y
+        else:
+            if x < self.min_x:
+                self.min_x = x
+            elif x > self.max_x:
+                self.max_x = x
+            if y < self.min_y:
+                self.min_y = y
+            elif y > self.max_y:
+                self.max_y = y
+
+    def __getitem__(self, v):
+        if not (0 <= v < len(self.placed) and self.placed[v]):
+            raise KeyError(v)
+        return int(self.x[v]), int(self.y[v])
+
+    def get(self, v, default=None):
+        return self[v] if v in self else default
+
+    def __contains__(self, v):
+        return isinstance(v, (int, np.integer)) and 0 <= v < len(self.placed) and bool(self.placed[v])
+
+    def __len__(self):
+        return self.count
+
+    def keys(self):
+        return np.flatnonzero(self.placed).tolist()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def values(self):
+        nodes = np.flatnonzero(self.placed)
+        return list(zip(self.x[nodes].tolist(), self.y[nodes].tolist()))
+
+    def items(self):
+        nodes = np.flatnonzero(self.placed)
+        return list(zip(nodes.tolist(), zip(self.x[nodes].tolist(), self.y[nodes].tolist())))
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+# Moving w and every vertex after it in frame (dict of positions in contour order) right by one.
+def shift_frame(frame, w):
+    shifted = False
+    for v, (x, y) in frame.items():
+        if v == w:
+            shifted = True
+        if shifted:
+            frame[v] = (x + 1, y)
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+class CSRGraph:
+    # Read-only undirected graph over CSR arrays, enough of the networkx.Graph interface
+    # for the drawing algorithms and for writing instances.
+
+    def __init__(self, indptr, indices, n):
+        self.indptr = indptr
+        self.indices = indices
+        self.n = n
+
+    def neighbors(self, v):
+        return self.indices[self.indptr[v]:self.indptr[v + 1]]
+
+    def has_edge(self, u, v):
+        nbrs = self.neighbors(u)
+        i = np.searchsorted(nbrs, v)
+        return i < len(nbrs) and nbrs[i] == v
+
+    def degree(self, v):
+        return int(self.indptr[v + 1] - self.indptr[v])
+
+    def nodes(self):
+        return np.flatnonzero(np.diff(self.indptr) > 0)
+
+    def edges(self):
+        sources = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+        mask = sources < self.indices
+        return zip(sources[mask].tolist(), self.indices[mask].tolist())
+
+    def number_of_nodes(self):
+        return self.n
+
+    def number_of_edges(self):
+        return len(self.indices) // 2
+
+    def to_networkx(self):
+        import networkx as nx
+        g = nx.Graph()
+        g.add_nodes_from(self.nodes().tolist())
+        g.add_edges_from(self.edges())
+        return g
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return iter(self.nodes().tolist())
+
+
+# CSR arrays (indptr, indices) of undirected graph given by edge arrays u, v over vertex ids < size.
+# Neighbours of every vertex are sorted.
+def csr_from_edges(u, v, size):
+    sources = np.concatenate((u, v)).astype(np.int64)
+    targets = np.concatenate((v, u)).astype(np.int32)
+    permutation = np.lexsort((targets, sources))
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(sources, minlength=size))
+    return indptr, targets[permutation]
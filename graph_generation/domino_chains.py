@@ -0,0 +1,83 @@
+from canonical_ordering import as_canonical_ordering
+
+UNDEFINED = -1
+
+
+class ZTable:
+    # Table of z vertices for domino chains, built in one pass over the canonical ordering.
+    # For v_k with leftmost contour neighbour wp, v_z is the first later vertex adjacent to both v_k and wp.
+    # Edge (wp, v_k) stays on the contour until some vertex covers it, and that vertex has wp and v_k
+    # next to each other in its contour neighbours. Every contour edge is covered at most once,
+    # so the pass is O(n + m) and does not touch the graph at all.
+    # The table only depends on the ordering, so it can be shared by algorithms running on the same ordering.
+    #
+    # rank[v]       - index of v in ordering
+    # z_index[v]    - index of v_z in ordering, UNDEFINED if edge (wp, v) is never covered
+    # z_position[v] - index of v in contour neighbours of v_z
+
+    def __init__(self, ordering):
+        ordering = as_canonical_ordering(ordering)
+        order = ordering.order.tolist()
+        contour_offsets = ordering.contour_offsets.tolist()
+        contour_nodes = ordering.contour_nodes.tolist()
+
+        self.rank = ordering.rank.tolist()
+        size = len(self.rank)
+        self.z_index = [UNDEFINED] * size
+        self.z_position = [UNDEFINED] * size
+
+        wp = [UNDEFINED] * size
+        for k in range(2, len(order)):
+            wp[order[k]] = contour_nodes[contour_offsets[k]]
+
+        for z in range(3, len(order)):
+            start = contour_offsets[z]
+            for i in range(start + 1, contour_offsets[z + 1]):
+                v = contour_nodes[i]
+                if self.rank[v] >= 2 and wp[v] == contour_nodes[i-1]:
+                    self.z_index[v] = z
+                    self.z_position[v] = i - start
+
+
+class DominoChains:
+    # Domino chains stored as parent pointers, DC(v) = DC(parent[v]) + [v] and depth[v] = len(DC(v)).
+    # Chains share their prefixes instead of copying them, so memory stays linear in n.
+    # Lists are only materialised on demand by chain() (or items() / [] for printing).
+
+    def __init__(self, size):
+        self.parent = [UNDEFINED] * size
+        self.depth = [0] * size
+        self.nodes = []
+
+    # Adding v at the end of chain of parent, or as a new chain when parent is UNDEFINED
+    def add(self, v, parent=UNDEFINED):
+        self.parent[v] = parent
+        self.depth[v] = 1 if parent == UNDEFINED else self.depth[parent] + 1
+        self.nodes.append(v)
+
+    # Materialised chain of v, from its first vertex to v
+    def chain(self, v):
+        chain = [UNDEFINED] * self.depth[v]
+        for i in range(len(chain) - 1, -1, -1):
+            chain[i] = v
+            v = self.parent[v]
+        return chain
+
+    def items(self):
+        for v in self.nodes:
+            yield v, self.chain(v)
+
+    def keys(self):
+        return iter(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __getitem__(self, v):
+        return self.chain(v)
+
+    def __contains__(self, v):
+        return 0 <= v < len(self.depth) and self.depth[v] > 0
+
+    def __len__(self):
+        return len(self.nodes)
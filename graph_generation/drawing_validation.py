@@ -0,0 +1,110 @@
+from functools import cmp_to_key
+
+from errors import DrawingError
+from visibility import orientation, segments_intersect
+
+# Validation of straight-line grid drawings: no two vertices share a position, no vertex lies on an edge
+# it is not incident to and no two edges meet outside of a common endpoint.
+# Sweep over the vertices in (x, y) order (a slightly tilted vertical line, so vertical edges need no special
+# case), the status holds the edges crossing the sweep line from bottom to top. As long as there is no
+# violation, the status is ordered and only neighbouring edges have to be tested (Shamos-Hoey), so the first
+# violation in sweep order is found with O(log m) comparisons per event. All predicates are exact integer
+# orientation tests from visibility.
+# The status is a Python list, inserting shifts the pointers behind the position with one memmove, which is
+# faster than a balanced tree in pure Python for the sizes we draw.
+
+
+class Segment:
+    # Edge (u, v) with left (lexicographically smaller) end point left = pos[u] and right = pos[v]
+
+    def __init__(self, u, v, left, right):
+        self.u = u
+        self.v = v
+        self.left = left
+        self.right = right
+
+    def __repr__(self):
+        return '({u}, {v})'.format(u=self.u, v=self.v)
+
+
+# Common point of segments other than a shared end point, a and b are different edges
+def segments_meet(a, b):
+    if a.u in (b.u, b.v) or a.v in (b.u, b.v):
+        # Edges sharing a vertex only meet elsewhere if they overlap on a line
+        q = a.left if a.left == b.left or a.left == b.right else a.right
+        p = a.right if q == a.left else a.left
+        r = b.right if q == b.left else b.left
+        return orientation(q, p, r) == 0 and (p[0] - q[0]) * (r[0] - q[0]) + (p[1] - q[1]) * (r[1] - q[1]) > 0
+    return segments_intersect(a.left, a.right, b.left, b.right)
+
+
+# First violation of drawing pos of graph g in sweep order, as (kind, elements) tuple, None for a valid drawing.
+# kinds: 'missing' (vertex without position), 'same_position' (two vertices), 'vertex_on_edge' (vertex, edge),
+# 'edges_meet' (two edges)
+def find_violation(g, pos):
+    vertices = list(g)
+    for v in vertices:
+        if v not in pos:
+            return 'missing', (v,)
+    points = dict((v, tuple(pos[v])) for v in vertices)
+    vertices.sort(key=lambda v: points[v])
+    for i in range(1, len(vertices)):
+        if points[vertices[i]] == points[vertices[i - 1]]:
+            return 'same_position', (vertices[i - 1], vertices[i])
+
+    starting = dict((v, []) for v in vertices)
+    for u, v in g.edges():
+        if points[u] > points[v]:
+            u, v = v, u
+        starting[u].append(Segment(u, v, points[u], points[v]))
+
+    status = []
+    for v in vertices:
+        p = points[v]
+
+        # First edge at or above p. Edges ending in p are on p, any other edge on p has p in its interior.
+        lo, hi = 0, len(status)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            t = status[mid]
+            if orientation(t.left, t.right, p) > 0:
+                lo = mid + 1
+            else:
+                hi = mid
+        i = lo
+        j = i
+        while j < len(status) and orientation(status[j].left, status[j].right, p) == 0:
+            if status[j].right != p:
+                return 'vertex_on_edge', (v, status[j])
+            j += 1
+        del status[i:j]
+
+        new = sorted(starting[v], key=cmp_to_key(lambda a, b: -orientation(p, a.right, b.right)))
+        status[i:i] = new
+
+        # Neighbouring pairs that are new after this event
+        first = max(i - 1, 0)
+        last = min(i + len(new), len(status) - 1)
+        for k in range(first, last):
+            if segments_meet(status[k], status[k + 1]):
+                return 'edges_meet', (status[k], status[k + 1])
+
+    return None
+
+
+def violation_message(violation):
+    kind, elements = violation
+    messages = {
+        'missing': 'vertex {0} has no position',
+        'same_position': 'vertices {0} and {1} have the same position',
+        'vertex_on_edge': 'vertex {0} lies on edge {1}',
+        'edges_meet': 'edges {0} and {1} meet',
+    }
+    return messages[kind].format(*elements)
+
+
+# Raising DrawingError with the first violation if pos is not a planar straight-line drawing of g
+def check_planar_drawing(g, pos):
+    violation = find_violation(g, pos)
+    if violation is not None:
+        raise DrawingError(violation_message(violation))
@@ -1,3 +1,23 @@
 class NumberOfNodesError(Exception):
     def __init__(self, message):
-        self.message = message
\ No newline at end of file
+        self.message = message
+
+
+class VisibilityError(Exception):
+    def __init__(self, message):
+        self.message = message
+
+
+class InstanceFormatError(Exception):
+    def __init__(self, message):
+        self.message = message
+
+
+class CanonicalOrderingError(Exception):
+    def __init__(self, message):
+        self.message = message
+
+
+class DrawingError(Exception):
+    def __init__(self, message):
+        self.message = message
@@ -1,17 +1,65 @@
-import networkx as nx
+import numpy as np
 import instances_preliminaries
-import io_graph_functions
-import matplotlib.pyplot as plt
 import os
-from shapely.geometry import LineString
+import time
+import visibility
+from canonical_ordering import as_integer_ordering
+from checkpoint import CheckpointWriter, has_checkpoint, read_checkpoint, restore_algorithm_state
+from contour import Contour
+from coordinates import CoordinateStore, shift_frame
+from domino_chains import ZTable, DominoChains
+from drawing_validation import find_violation, violation_message
+from errors import VisibilityError
+from profiling import AlgorithmProfiler
+from runtime_log import LOG_EVENTS, LOG_FULL, open_runtime_log
+from shift_engine import RelativeShiftEngine
+from u_sets import USetForest
 
 UNDEFINED = -1
+# Insertions between two checkpoints of a run
+CHECKPOINT_EVERY = 10000
+
+
+class LayoutStep:
+    # State of the drawing right after v_k was placed and the contour updated, yielded by
+    # GraphDrawingAlgorithm.steps. Nothing is copied: contour is the live contour of the algorithm,
+    # so a step is only valid until the generator is resumed.
+    # shift - how many times the contour from wq on (with U-sets) was moved right while placing v_k
+
+    def __init__(self, algorithm, k, vertex, shift):
+        self.algorithm = algorithm
+        self.k = k
+        self.vertex = vertex
+        self.contour = algorithm.contour
+        self.width = algorithm.width
+        self.height = algorithm.height
+        self.shift = shift
+
+    # Absolute position of the new vertex
+    def position(self):
+        return self.algorithm.contour_position(self.vertex)
+
+    # Contour vertices moved by the shifts of this step, each by shift (their U-sets move with them)
+    def moved_contour(self):
+        if self.shift == 0:
+            return []
+        return list(self.contour.nodes_from(self.contour.right(self.vertex)))
+
 
 class GraphDrawingAlgorithm:
     UNDEFINED = -1
+    # Set by enable_profiling on the instance, kept over the __init__ in init_calculations
+    profiler = None
 
     def __init__(self):
         self.g = None
+        # Nodes of the graph when they were relabelled to integers, see init_ordering
+        self.labels = None
+        # segments_intersect calls of check_visible, read by the profiler
+        self.segment_tests = 0
+        # Contour neighbours of the vertex being placed, see contour_neighbors
+        self.current_k = UNDEFINED
+        self.current_neighbors = None
         self.u_set = dict()
         self.DC = dict()
         self.dom = dict()
@@ -20,7 +68,20 @@ class GraphDrawingAlgorithm:
         self.contour = []
         self.debug = False
         self.ordering = None
-        self.log_file = None
+        self.log = None
+        # Optional relative shift engine, and the positions the current placement step reads from
+        self.engine = None
+        self.view = self.pos
+        self.z_table = None
+        # Size of the drawing, kept up to date by place_vertex and shift_vertex
+        self.width = 0
+        self.height = 0
+        self.checkpoint = None
+        self.renderer = None
+        # G_k in debug mode, drawing of it is validated after every step
+        self.debug_graph = None
+        # Seconds spent in the phases of the last run, for benchmarks
+        self.phase_times = dict()
 
     # Getting dummy ordering, ordering from original article for debugging purposes.
     def dummy_ordering(self):
@@ -48,6 +109,7 @@ class GraphDrawingAlgorithm:
 
     # Original graph instance used in article. For debugging purposes.
     def test_graph(self):
+        import networkx as nx
         g = nx.Graph()
         g.add_edge(1, 2)
         g.add_edge(1, 3)
@@ -115,130 +177,141 @@ class GraphDrawingAlgorithm:
     # Setting initial position of vertices (first three)
     # for now just for A algorithm.
     def set_inital_pos(self):
+        size = len(self.ordering.rank)
+        self.pos = CoordinateStore(size)
+        self.view = self.pos
         # if there is just 3 nodes (basic case)
         if len(self.ordering) == 3:
-            self.pos[self.ordering[0][0]] = (0, 0)
-            self.pos[self.ordering[1][0]] = (1, 0)
-            self.pos[self.ordering[2][0]] = (0, 1)
+            self.pos[self.ordering.vertex(0)] = (0, 0)
+            self.pos[self.ordering.vertex(1)] = (1, 0)
+            self.pos[self.ordering.vertex(2)] = (0, 1)
             return self.pos
 
-        self.contour = [self.ordering[0][0], self.ordering[2][0],  self.ordering[1][0]]
+        self.contour = Contour(size, [self.ordering.vertex(0), self.ordering.vertex(2),  self.ordering.vertex(1)])
         # embedding first 3 nodes.
-        self.pos[self.ordering[0][0]] = (0, 0)
-        self.pos[self.ordering[1][0]] = (2, 0)
-        self.pos[self.ordering[2][0]] = (1, 1)
+        self.pos[self.ordering.vertex(0)] = (0, 0)
+        self.pos[self.ordering.vertex(1)] = (2, 0)
+        self.pos[self.ordering.vertex(2)] = (1, 1)
+        self.width = 2
+        self.height = 1
 
     # Getting z vertex for calculation of Domino chains.
     # k is index of vertex in canonical ordering, v_k is node number, w_p is leftmost neighbour of v_k in G_k-1
+    # Returns index of v_z in ordering and index of v_k among contour neighbours of v_z.
     def get_z_for(self, k, v_k, w_p):
-        for k in range(k+1, len(self.ordering)):
-            if self.g.has_edge(v_k, self.ordering[k][0]) and self.g.has_edge(w_p, self.ordering[k][0]):
-                return k
-        return self.UNDEFINED
+        return self.z_table.z_index[v_k], self.z_table.z_position[v_k]
 
-    # Recursive function for calculation domino chain for kth node in ordering
+    # Calculating domino chain, dominator and stability for kth node in ordering.
+    # v_z comes later in ordering, so it has to be processed before v_k.
     def find_dc_for_k(self, k):
-        v_k, contour_neighbors = self.ordering[k]
-        if v_k in self.DC.keys():
+        v_k = self.ordering.vertex(k)
+        if v_k in self.DC:
             return
 
-        z = self.get_z_for(k, v_k, contour_neighbors[0])
-        v_z, z_neighbours = self.ordering[z]
-        ind_z_v = z_neighbours.index(v_k)+1
+        z, z_position = self.get_z_for(k, v_k, self.ordering.contour_neighbors(k)[0])
+        v_z = self.ordering.vertex(z)
+        ind_z_v = z_position + 1
 
         if ind_z_v == 2:
-            self.DC[v_k] = [v_k]
+            self.DC.add(v_k)
             self.dom[v_k] = v_z
             self.stable[v_k] = False
 
         if ind_z_v >= 4:
-            self.DC[v_k] = [v_k]
+            self.DC.add(v_k)
             self.dom[v_k] = v_z
             self.stable[v_k] = True
 
         if ind_z_v == 3:
-            if z < len(self.g):
-                self.find_dc_for_k(z)
-            self.DC[v_k] = self.DC[v_z].copy()
-            self.DC[v_k].append(v_k)
+            self.DC.add(v_k, v_z)
             self.dom[v_k] = self.dom[v_z]
             self.stable[v_k] = self.stable[v_z]
 
     # Parent function for domino chains calculation
+    # Goes backwards through ordering, so every dominator is known before the chains it starts,
+    # one iterative pass instead of recursion along the chains.
     def calculate_DC(self):
-        n = len(self.g) - 1
-        v_n = self.ordering[n][0]
-        v_1 = self.ordering[0][0]
-        v_2 = self.ordering[1][0]
+        n = len(self.ordering) - 1
+        v_n = self.ordering.vertex(n)
+        v_1 = self.ordering.vertex(0)
+        v_2 = self.ordering.vertex(1)
 
-        self.DC[v_n] = [v_n]
+        self.DC = DominoChains(len(self.z_table.rank))
+        self.DC.add(v_n)
         self.dom[v_n] = self.UNDEFINED
         self.stable[v_n] = True
 
         self.stable[v_1] = True
         self.stable[v_2] = True
 
-        for k in range(2, len(self.ordering)):
+        for k in range(n - 1, 1, -1):
             self.find_dc_for_k(k)
 
     # Calculating U-sets for shift operations.
     def calculate_u_sets(self):
+        self.u_set = USetForest(len(self.z_table.rank))
         for i in range(3):
-            vi = self.ordering[i][0]
-            self.u_set[vi] = [vi]
+            vi = self.ordering.vertex(i)
+            self.u_set.add(vi)
 
         for k in range(3, len(self.ordering)):
-            v_k, contour = self.ordering[k]
-            self.u_set[v_k] = [v_k]
-            for l in range(1, len(contour)-1):
-                for t in self.u_set[contour[l]]:
-                    self.u_set[v_k].append(t)
+            self.u_set.add(self.ordering.vertex(k), self.ordering.contour_neighbors(k)[1:-1].tolist())
 
     # Shift vertex logic. wq is rightmost neighbor, or node from which to shift.
     def shift_vertex(self, v_k, wq):
-        q = self.contour.index(wq)
-
         if self.debug:
-            print('Shifting {nodes} from node {v_k}'.format(v_k=v_k, nodes=self.contour[q:]))
+            print('Shifting {nodes} from node {v_k}'.format(v_k=v_k, nodes=list(self.contour.nodes_from(wq))))
+
+        # v_1 stays at x = 0 and v_2 is always shifted, so every shift makes the drawing wider by one
+        self.width += 1
+        if self.engine is not None:
+            self.engine.shift(wq)
+            return
 
-        for i in range(q, len(self.contour)):
-            for t in self.u_set[self.contour[i]]:
-                self.pos[t] = (self.pos[t][0] + 1, self.pos[t][1])
+        # Contour vertices are moved right away, the rest of their U-sets when positions are resolved
+        nodes = np.array(list(self.contour.nodes_from(wq)))
+        self.pos.shift(nodes)
+        self.u_set.shift(nodes)
+        shift_frame(self.view, wq)
+
+    # Contour neighbours of kth vertex as list, built once per vertex and shared by the methods placing it
+    def contour_neighbors(self, k):
+        if k != self.current_k:
+            self.current_k = k
+            self.current_neighbors = self.ordering.contour_neighbors(k).tolist()
+        return self.current_neighbors
 
     # Updating contour after adding new vertex to Gk
     def update_outer_face(self, k):
-        v_k, contour_neighbors = self.ordering[k]
+        v_k = self.ordering.vertex(k)
+        contour_neighbors = self.contour_neighbors(k)
         wp = contour_neighbors[0]
         wq = contour_neighbors[-1]
-        p = self.contour.index(wp)
-        q = self.contour.index(wq)
-        self.contour = self.contour[:p+1] + [v_k] + self.contour[q:]
+        self.contour.splice(v_k, wp, wq)
 
     # Calculating y_k based on visibility
     # x_k is x coordinate of vertex, begin_y is initial value of y coordinate, k is kth  node in ordering.
     def get_y_prime(self, x_k, begin_y, k):
-        y_k = begin_y
-        increment = 0
-        while increment < 100:
-            if self.check_visible(x_k, y_k + increment, k):
-                break
-            increment = increment + 1
+        vk = self.ordering.vertex(k)
+        neighbours = self.contour_neighbors(k)
+        y_k = visibility.min_visible_y(x_k, begin_y, [self.view[wi] for wi in neighbours])
 
-        if increment == 99:
-            raise Exception('Problems')
+        if self.debug and not self.check_visible(x_k, y_k, k):
+            raise VisibilityError('({x}, {y}) does not see all neighbours of {vk}'.format(x=x_k, y=y_k, vk=vk))
 
-        return y_k + increment
+        return y_k
 
     # Checking if position (x_k, y_k) for kth node is satisfying visibility condition against contour C_k-1
+    # Contour is x-monotone, so only segments between wp and wq can be hit.
     def check_visible(self, x_k, y_k, k):
-        vk, neighbours = self.ordering[k]
+        vk = self.ordering.vertex(k)
+        neighbours = self.contour_neighbors(k)
         for wi in neighbours:
-            line = LineString([(x_k, y_k), self.pos[wi]])
-            for i in range(0, len(self.contour)-2):
-                if wi == self.contour[i] or wi == self.contour[i+1]:
+            for i in range(0, len(neighbours)-1):
+                if wi == neighbours[i] or wi == neighbours[i+1]:
                     continue
-                other = LineString([self.pos[self.contour[i]], self.pos[self.contour[i+1]]])
-                if line.intersects(other):
+                self.segment_tests += 1
+                if visibility.segments_intersect((x_k, y_k), self.view[wi], self.view[neighbours[i]], self.view[neighbours[i+1]]):
                     return False
 
         return True
@@ -309,115 +382,296 @@ class GraphDrawingAlgorithm:
         if path is not None:
             f.close()
 
-        if self.log_file is not None:
-            self.log_file.write('Width: {width}, Height: {height}\n'.format(width=self.pos[2][0], height=self.pos[len(self.pos)][1]))
-        print('Width: {width}, Height: {height}'.format(width=self.pos[2][0], height=self.pos[len(self.pos)][1]))
+        if self.log is not None:
+            self.log.size(self.pos.width(), self.pos.height())
+        print('Width: {width}, Height: {height}'.format(width=self.pos.width(), height=self.pos.height()))
 
-    def init_calculations(self, g, ordering):
+    # Positions of the contour run nodes used while placing v_k, as dict.
+    # Without the shift engine these are the absolute positions, with it x is relative to wp.
+    def get_view(self, nodes, wp):
+        if self.engine is not None:
+            self.view = self.engine.frame(nodes, wp)
+        else:
+            self.view = self.pos.frame(nodes)
+        return self.view
+
+    # Storing position of v_k placed on top of its contour neighbours.
+    def place_vertex(self, v_k, contour_neighbors, x_k, y_k):
+        self.view[v_k] = (x_k, y_k)
+        if y_k > self.height:
+            self.height = y_k
+        if self.engine is not None:
+            self.engine.place(v_k, contour_neighbors, x_k, y_k)
+        else:
+            self.pos[v_k] = (x_k, y_k)
+
+    # Absolute positions of all placed vertices.
+    def get_pos(self):
+        if self.engine is not None:
+            return self.engine.positions()
+        return self.u_set.resolve(self.pos)
+
+    # Absolute position of contour vertex v, contour vertices are never behind in shifts.
+    def contour_position(self, v):
+        if self.engine is not None:
+            return self.engine.contour_position(self.contour, v)
+        return self.pos[v]
+
+    # g               - graph or instances_preliminaries.PreparedInstance, embedding and ordering are computed once per graph.
+    # relative_shifts - use RelativeShiftEngine instead of shifting absolute positions of U-sets.
+    # z_table         - ZTable of the ordering, when it is shared with other runs on the same ordering.
+    def init_calculations(self, g, ordering, relative_shifts=False, z_table=None):
         self.__init__()
-        self.g = g
-
-        # Calculate embedding for canonical ordering
-        _, embedding = nx.check_planarity(self.g)
-        max_node = len(g)
+        instance = instances_preliminaries.prepare_instance(g)
+        self.g = instance.g
 
         # Calculate canonical ordering
-        self.ordering = instances_preliminaries.inner_get_canonical_ordering(embedding, [1, 2,
-                                                                                         max_node]) if ordering is None else ordering
+        self.init_ordering(instance.ordering if ordering is None else ordering)
+        if ordering is None and z_table is None and self.labels is None:
+            z_table = instance.z_table
+
         self.set_inital_pos()
+        start_time = time.perf_counter()
+        self.z_table = ZTable(self.ordering) if z_table is None else z_table
+        self.phase_times['z_table'] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
         self.calculate_DC()
+        self.phase_times['calculate_DC'] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
         self.calculate_u_sets()
+        self.phase_times['calculate_u_sets'] = time.perf_counter() - start_time
+
+        if relative_shifts:
+            self.engine = RelativeShiftEngine(self.ordering)
+
+    # Orderings of graphs with other than integer nodes (e.g. strings) are relabelled to 0, ..., n-1, the
+    # run works on the integers and the drawing is mapped back to the nodes by drawing().
+    def init_ordering(self, ordering):
+        self.ordering, self.labels = as_integer_ordering(ordering)
+
+    # Positions of the run with the nodes of the graph
+    def drawing(self):
+        if self.labels is None:
+            return self.pos
+        return dict((self.labels[v], position) for v, position in self.pos.items())
+
+    # Initialising run, from the last checkpoint in checkpoint_path when resume is set and there is one.
+    # checkpoint_path  - checkpoint file of the run (see checkpoint.py), None for no checkpoints
+    # checkpoint_every - insertions between two checkpoints
+    # Returns k of the first vertex that still has to be inserted.
+    def init_run(self, g, ordering, relative_shifts=False, z_table=None, checkpoint_path=None,
+                 checkpoint_every=CHECKPOINT_EVERY, resume=False):
+        if resume and has_checkpoint(checkpoint_path):
+            return self.resume_calculations(g, ordering, checkpoint_path, checkpoint_every)
+
+        self.init_calculations(g, ordering, relative_shifts, z_table)
+        if checkpoint_path is not None:
+            self.checkpoint = CheckpointWriter(checkpoint_path, checkpoint_every)
+        return 3
+
+    # Restoring state after the last checkpoint instead of init_calculations, only the ordering is taken from g.
+    # The checkpoint decides if the shift engine is used.
+    def resume_calculations(self, g, ordering, checkpoint_path, checkpoint_every=CHECKPOINT_EVERY):
+        self.__init__()
+        instance = instances_preliminaries.prepare_instance(g)
+        self.g = instance.g
+        self.init_ordering(instance.ordering if ordering is None else ordering)
+
+        k, state, end = read_checkpoint(checkpoint_path)
+        restore_algorithm_state(self, state)
+        self.checkpoint = CheckpointWriter(checkpoint_path, checkpoint_every, k, state, end)
+        return k + 1
+
+    # Called after inserting kth vertex
+    def save_checkpoint(self, k):
+        if self.checkpoint is not None:
+            self.checkpoint.step(self, k)
+
+    def close_checkpoint(self):
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+            self.checkpoint = None
+
+    # Snapshots of the run are rendered by renderer (StepRenderer) in background processes.
+    # Debug runs with output_path render every step to output_path/steps/name by default.
+    def init_renderer(self, renderer, debug, output_path, name):
+        if renderer is None and debug and output_path:
+            from step_renderer import StepRenderer
+            renderer = StepRenderer('{path}/steps/{name}'.format(path=output_path, name=name))
+        if renderer is not None:
+            renderer.start(self.ordering)
+        self.renderer = renderer
+
+    # Called after inserting kth vertex, positions are only resolved for steps the renderer wants
+    def render_step(self, k):
+        if self.renderer is not None and self.renderer.wants(k):
+            self.renderer.submit(k, self.ordering.vertex(k), self.get_pos())
+
+    def close_renderer(self):
+        if self.renderer is not None:
+            self.renderer.close()
+            self.renderer = None
+
+    # Debug mode: drawing of G_k is validated after every step, start is the first vertex still to insert
+    def init_debug_graph(self, start):
+        from step_renderer import graph_of_step
+        self.debug_graph = graph_of_step(self.ordering, start - 1)
+
+    def validate_step(self, k):
+        v_k = self.ordering.vertex(k)
+        contour_neighbors = self.contour_neighbors(k)
+        for w in contour_neighbors:
+            self.debug_graph.add_edge(v_k, w)
+        violation = find_violation(self.debug_graph, self.get_pos())
+        if violation is not None:
+            print('Drawing of G_{k} is not planar: {message}'.format(k=k + 1, message=violation_message(violation)))
+
+    # Runtime log of a run with output_path, the full text log in debug mode unless log_level is given
+    def init_log(self, output_path, suffix, debug, log_level=None, append=False):
+        if log_level is None:
+            log_level = LOG_FULL if debug else LOG_EVENTS
+        self.log = open_runtime_log(output_path, suffix, log_level, append)
+
+    # Instrumenting this instance with AlgorithmProfiler (see profiling.py), runs with output_path
+    # write its report next to the runtime log.
+    def enable_profiling(self, sample_every=1):
+        return AlgorithmProfiler(sample_every).attach(self)
+
+    def write_profile(self, output_path, suffix):
+        if self.profiler is not None and output_path is not None:
+            self.profiler.write('{output_path}/profile{suffix}.json'.format(output_path=output_path, suffix=suffix))
 
     def run(self, g):
         pass
 
+    # Placing kth vertex of ordering, implemented by the algorithms
+    def place_kth(self, k):
+        pass
+
+    # Incremental layout, yields LayoutStep after every inserted vertex v_4, ..., v_n.
+    # Arguments are the same as in run, positions of the finished drawing are in self.pos afterwards.
+    def steps(self, g, ordering=None, relative_shifts=False, z_table=None, checkpoint_path=None,
+              checkpoint_every=CHECKPOINT_EVERY, resume=False):
+        start = self.init_run(g, ordering, relative_shifts, z_table, checkpoint_path, checkpoint_every, resume)
+
+        for k in range(start, len(self.ordering)):
+            width = self.width
+            self.place_kth(k)
+            self.update_outer_face(k)
+            self.save_checkpoint(k)
+            yield LayoutStep(self, k, self.ordering.vertex(k), self.width - width)
+
+        self.close_checkpoint()
+        self.pos = self.get_pos()
+
 
 class AAlgorithm(GraphDrawingAlgorithm):
     # Run method of algorithm
     # debug         - indicator for debug values
     # output_path   - path for future saving of snapshots during graph forming
     # ordering      - ordering value for custom orderings (for debugging purposes only).
+    # relative_shifts - keep x-coordinates relative in RelativeShiftEngine, O(1) amortized shifts.
+    # z_table       - precomputed ZTable for ordering, shared between runs on the same ordering.
+    # checkpoint_path, checkpoint_every, resume - checkpoints of the run, see init_run.
+    # renderer      - StepRenderer for snapshots of the steps, see init_renderer.
+    # log_level     - verbosity of the runtime log in output_path (see runtime_log.py), LOG_FULL in debug mode,
+    #                 LOG_EVENTS otherwise.
 
-    def run(self, g, debug=False, output_path=None, ordering=None):
-        self.init_calculations(g, ordering)
+    def run(self, g, debug=False, output_path=None, ordering=None, relative_shifts=False, z_table=None,
+            checkpoint_path=None, checkpoint_every=CHECKPOINT_EVERY, resume=False, renderer=None, log_level=None):
+        start = self.init_run(g, ordering, relative_shifts, z_table, checkpoint_path, checkpoint_every, resume)
 
-        if output_path is not None:
-            self.log_file = open('{output_path}/runtime_a.log'.format(output_path=output_path), "w")
+        self.init_log(output_path, '_a', debug, log_level, append=start > 3)
 
-        if output_path is not None:
+        if output_path is not None and start == 3:
             os.mkdir('{output_path}/steps/aalgorithm'.format(output_path=output_path))
 
+        self.init_renderer(renderer, debug, output_path, 'aalgorithm')
+
         if debug:
             self.debug = debug
-            dg = nx.Graph() # debug_graph
-            dg.add_edge(self.ordering[0][0], self.ordering[1][0])
-            v3, v3_neighbours = self.ordering[2]
-            for l in v3_neighbours:
-                dg.add_edge(v3, l)
+            self.init_debug_graph(start)
 
-        for k in range(3, len(self.ordering)):
-            vk, contour_neighbors = self.ordering[k]
-            wp = contour_neighbors[0]
-            wp1 = contour_neighbors[1]
-            wq = contour_neighbors[-1]
-            wq1 = contour_neighbors[-2]
+        start_time = time.perf_counter()
+        for k in range(start, len(self.ordering)):
+            vk = self.ordering.vertex(k)
+            contour_neighbors = self.contour_neighbors(k)
 
             if debug:
-                for l in contour_neighbors:
-                    dg.add_edge(vk, l)
                 print('Node: {node}, neighbours: {neighbours}, outer_face: {outer_face}'.format(node=vk, neighbours=contour_neighbors, outer_face=self.contour))
 
-            if self.log_file is not None:
-                self.log_file.write('Node: {node}, neighbours: {neighbours}, outer_face: {outer_face}\n'.format(node=vk, neighbours=contour_neighbors, outer_face=self.contour))
+            if self.log is not None:
+                self.log.vertex(k, vk, contour_neighbors, self.contour)
 
-            y_k = max(self.pos[wp1][1], self.pos[wq1][1])
+            self.place_kth(k)
 
-            deg_v_k = len(contour_neighbors)
-            if deg_v_k == 2 :
-                # shift
-                if not self.stable[vk]:
-                    self.shift_vertex(vk, wq)
+            self.update_outer_face(k)
+            self.save_checkpoint(k)
+            self.render_step(k)
+            if debug:
+                self.validate_step(k)
 
-                # upward
-                if self.pos[wp][1] < self.pos[wq][1] and self.pos[wp][0] < self.pos[wq][0]:
-                    y_k = self.pos[wq][1]
+        self.phase_times['placement'] = time.perf_counter() - start_time
 
-                # horizontal
-                if self.pos[wp][1] == self.pos[wq][1]:
-                    y_k = self.pos[wq][1] + 1
+        self.close_checkpoint()
+        self.close_renderer()
+        start_time = time.perf_counter()
+        self.pos = self.get_pos()
+        self.phase_times['resolve'] = time.perf_counter() - start_time
 
-                # downward
-                if self.pos[wp][1] > self.pos[wq][1] and self.pos[wp][0] < self.pos[wq][0]:
-                    if self.stable[vk]:
-                        y_k = self.pos[wp][1] + 1
-                    else:
-                        y_k = self.pos[wp][1]
+        if debug:
+            self.print_alg_stats(path=output_path, suffix='_a')
 
-            if self.stable[vk]:
-                x_k = self.pos[wp][0]
-            else:
-                x_k = self.pos[wp][0] + 1
+        if self.log is not None:
+            self.log.close()
 
-            if deg_v_k != 2:
-                y_k = self.get_y_prime(x_k, y_k, k)
-            self.pos[vk] = (x_k, y_k)
+        self.write_profile(output_path, '_a')
+        return self.drawing()
 
-            self.update_outer_face(k)
+    # Placing kth vertex of ordering on top of its contour neighbours, shifting if needed
+    def place_kth(self, k):
+        vk = self.ordering.vertex(k)
+        contour_neighbors = self.contour_neighbors(k)
+        wp = contour_neighbors[0]
+        wp1 = contour_neighbors[1]
+        wq = contour_neighbors[-1]
+        wq1 = contour_neighbors[-2]
 
-            # if debug:
-            #     io_graph_functions.draw_graph(dg, self.pos)
+        deg_v_k = len(contour_neighbors)
+        pos = self.get_view(contour_neighbors, wp)
 
-            if debug and output_path:
-                plt.clf()
-                io_graph_functions.save_graph_pic_to_file(dg, '{path}/steps/aalgorithm/adding_{k}_{vk}.png'.format(vk=vk,k=k, path=output_path),pos=self.pos)
+        y_k = max(pos[wp1][1], pos[wq1][1])
 
-        if debug:
-            self.print_alg_stats(path=output_path, suffix='_a')
+        if deg_v_k == 2 :
+            # shift
+            if not self.stable[vk]:
+                self.shift_vertex(vk, wq)
 
-        if self.log_file is not None:
-            self.log_file.close()
+            # upward
+            if pos[wp][1] < pos[wq][1] and pos[wp][0] < pos[wq][0]:
+                y_k = pos[wq][1]
 
-        return self.pos
+            # horizontal
+            if pos[wp][1] == pos[wq][1]:
+                y_k = pos[wq][1] + 1
+
+            # downward
+            if pos[wp][1] > pos[wq][1] and pos[wp][0] < pos[wq][0]:
+                if self.stable[vk]:
+                    y_k = pos[wp][1] + 1
+                else:
+                    y_k = pos[wp][1]
+
+        if self.stable[vk]:
+            x_k = pos[wp][0]
+        else:
+            x_k = pos[wp][0] + 1
+
+        if deg_v_k != 2:
+            y_k = self.get_y_prime(x_k, y_k, k)
+        self.place_vertex(vk, contour_neighbors, x_k, y_k)
 
 # Still in progress...
 class BAlgorithm(GraphDrawingAlgorithm):
@@ -425,108 +679,143 @@ class BAlgorithm(GraphDrawingAlgorithm):
     # debug         - indicator for debug values
     # output_path   - path for future saving of snapshots during graph forming
     # ordering      - ordering value for custom orderings (for debugging purposes only).
-
-    def run(self, g, debug=False, output_path=None, ordering=None):
-        self.init_calculations(g, ordering)
-        if output_path is not None:
+    # relative_shifts - keep x-coordinates relative in RelativeShiftEngine, O(1) amortized shifts.
+    # z_table       - precomputed ZTable for ordering, shared between runs on the same ordering.
+    # checkpoint_path, checkpoint_every, resume - checkpoints of the run, see init_run.
+    # renderer      - StepRenderer for snapshots of the steps, see init_renderer.
+    # log_level     - verbosity of the runtime log in output_path (see runtime_log.py), LOG_FULL in debug mode,
+    #                 LOG_EVENTS otherwise.
+
+    def run(self, g, debug=False, output_path=None, ordering=None, relative_shifts=False, z_table=None,
+            checkpoint_path=None, checkpoint_every=CHECKPOINT_EVERY, resume=False, renderer=None, log_level=None):
+        start = self.init_run(g, ordering, relative_shifts, z_table, checkpoint_path, checkpoint_every, resume)
+        if output_path is not None and start == 3:
             os.mkdir('{output_path}/steps/balgorithm'.format(output_path=output_path))
 
-        if output_path is not None:
-            self.log_file = open('{output_path}/runtime_b.log'.format(output_path=output_path), "w")
+        self.init_renderer(renderer, debug, output_path, 'balgorithm')
+
+        self.init_log(output_path, '_b', debug, log_level, append=start > 3)
 
         if debug:
             self.debug = debug
-            dg = nx.Graph() # debug_graph
-            dg.add_edge(self.ordering[0][0], self.ordering[1][0])
-            v3, v3_neighbours = self.ordering[2]
-            for l in v3_neighbours:
-                dg.add_edge(v3, l)
+            self.init_debug_graph(start)
 
-        for k in range(3, len(self.ordering)):
-            vk, contour_neighbors = self.ordering[k]
-            wp = contour_neighbors[0]
-            wp1 = contour_neighbors[1]
-            wq = contour_neighbors[-1]
-            wq1 = contour_neighbors[-2]
+        start_time = time.perf_counter()
+        for k in range(start, len(self.ordering)):
+            vk = self.ordering.vertex(k)
+            contour_neighbors = self.contour_neighbors(k)
+            self.place_kth(k)
 
-            if vk == 9:
-                d = 'd'
+            if debug:
+                print('Node: {node}, neighbours: {neighbours}, outer_face: {outer_face}'.format(node=vk, neighbours=contour_neighbors, outer_face=self.contour))
 
-            if self.stable[vk]:
-                x_k = self.pos[wp][0]
-            else:
-                x_k = self.pos[wp][0] + 1
+            if self.log is not None:
+                self.log.vertex(k, vk, contour_neighbors, self.contour)
 
-            deg_v_k = len(contour_neighbors)
-            if deg_v_k == 2:
-                if self.stable[vk]:
-                    y_k = max(self.pos[wp][1] + 1, self.pos[wq][1])
-                else:
-                    self.shift_vertex(vk, wq)
-                    if self.pos[wp][1] < self.pos[wq][1] and self.pos[wp][0] < self.pos[wq][0]:
-                        y_k = self.pos[wq][1]
-                    else:
-                        y_k = max(self.pos[wp][1], self.pos[wq][1] + 1)
-            else:
-                r = self.find_r_for_vk(k)
-                wr = contour_neighbors[r]
-                wr_1 = contour_neighbors[r-1]
-                y_p = self.pos[wr][1] + 4 * (self.pos[wr][0] - x_k) - self.slack(wr_1, wr)
+            self.update_outer_face(k)
+            self.save_checkpoint(k)
+            self.render_step(k)
+            if debug:
+                self.validate_step(k)
+
+        self.phase_times['placement'] = time.perf_counter() - start_time
+
+        self.close_checkpoint()
+        self.close_renderer()
+        start_time = time.perf_counter()
+        self.pos = self.get_pos()
+        self.phase_times['resolve'] = time.perf_counter() - start_time
+
+        if debug:
+            self.print_alg_stats(path=output_path, suffix='_b')
+
+        if self.log is not None:
+            self.log.close()
 
-                if r == 1 or (not self.stable[vk] and r == 2):
-                    y_p = y_p + 1
+        self.write_profile(output_path, '_b')
+        return self.drawing()
 
-                y_k = max(y_p, self.pos[wq1][1])
+    # Placing kth vertex of ordering, slack of the new edge (vk, wq) is kept positive by a shift
+    def place_kth(self, k):
+        vk = self.ordering.vertex(k)
+        contour_neighbors = self.contour_neighbors(k)
+        wp = contour_neighbors[0]
+        wp1 = contour_neighbors[1]
+        wq = contour_neighbors[-1]
+        wq1 = contour_neighbors[-2]
+        pos = self.get_view(contour_neighbors, wp)
 
-            self.pos[vk] = (x_k, y_k)
+        if self.stable[vk]:
+            x_k = pos[wp][0]
+        else:
+            x_k = pos[wp][0] + 1
 
-            if self.slack(vk, wq) == 0:
+        deg_v_k = len(contour_neighbors)
+        if deg_v_k == 2:
+            if self.stable[vk]:
+                y_k = max(pos[wp][1] + 1, pos[wq][1])
+            else:
                 self.shift_vertex(vk, wq)
+                if pos[wp][1] < pos[wq][1] and pos[wp][0] < pos[wq][0]:
+                    y_k = pos[wq][1]
+                else:
+                    y_k = max(pos[wp][1], pos[wq][1] + 1)
+        else:
+            r = self.find_r_for_vk(k)
+            wr = contour_neighbors[r]
+            wr_1 = contour_neighbors[r-1]
+            y_p = pos[wr][1] + 4 * (pos[wr][0] - x_k) - self.slack(wr_1, wr)
 
-            if debug:
-                for l in contour_neighbors:
-                    dg.add_edge(vk, l)
-                print('Node: {node}, neighbours: {neighbours}, outer_face: {outer_face}'.format(node=vk, neighbours=contour_neighbors, outer_face=self.contour))
-                if self.log_file is not None:
-                    self.log_file.write(
-                        'Node: {node}, neighbours: {neighbours}, outer_face: {outer_face}\n'.format(node=vk,
-                                                                                                    neighbours=contour_neighbors,
-                                                                                                    outer_face=self.contour))
+            if r == 1 or (not self.stable[vk] and r == 2):
+                y_p = y_p + 1
 
-            self.update_outer_face(k)
+            y_k = max(y_p, pos[wq1][1])
 
-            if debug:
-                io_graph_functions.draw_graph(dg, self.pos)
+        self.place_vertex(vk, contour_neighbors, x_k, y_k)
 
-                if debug and output_path:
-                    plt.clf()
-                    io_graph_functions.save_graph_pic_to_file(dg, '{path}/steps/balgorithm/adding_{k}_{vk}.png'.format(
-                        vk=vk, k=k, path=output_path), pos=self.pos)
+        if self.slack(vk, wq) == 0:
+            self.shift_vertex(vk, wq)
 
-        if debug:
-            self.print_alg_stats(path=output_path, suffix='_b')
+    # Slack of contour edges is kept per right end of the edge in edge_slack, set when a vertex is
+    # placed and increased by shifts, instead of being recomputed from positions.
+    def init_calculations(self, g, ordering, relative_shifts=False, z_table=None):
+        super().init_calculations(g, ordering, relative_shifts, z_table)
+        self.init_slack()
 
-        if self.log_file is not None:
-            self.log_file.close()
+    def init_slack(self):
+        self.edge_slack = [0] * len(self.z_table.rank)
+        v1, v2, v3 = self.ordering.vertex(0), self.ordering.vertex(1), self.ordering.vertex(2)
+        self.edge_slack[v3] = self.position_slack(v1, v3)
+        self.edge_slack[v2] = self.position_slack(v3, v2)
 
-        return self.pos
+    def position_slack(self, u, v):
+        return 4 * (self.view[v][0]-self.view[u][0]) + (self.view[v][1]-self.view[u][1])
 
+    # Slack of contour edge (u, v), or of (v_k, wq) between placing v_k and updating the contour
     def slack(self, u, v):
-        return 4 * (self.pos[v][0]-self.pos[u][0]) + (self.pos[v][1]-self.pos[u][1])
+        return self.edge_slack[v]
+
+    def place_vertex(self, v_k, contour_neighbors, x_k, y_k):
+        super().place_vertex(v_k, contour_neighbors, x_k, y_k)
+        self.edge_slack[v_k] = self.position_slack(contour_neighbors[0], v_k)
+        self.edge_slack[contour_neighbors[-1]] = self.position_slack(v_k, contour_neighbors[-1])
 
+    # Shift moves wq and everything right of it, so only the edge ending in wq gets longer
+    def shift_vertex(self, v_k, wq):
+        super().shift_vertex(v_k, wq)
+        self.edge_slack[wq] += 4
+
+    # r is the start of the longest suffix of stable contour neighbours, not before begin
     def find_r_for_vk(self, k):
-        vk, contour_neighbors = self.ordering[k]
+        vk = self.ordering.vertex(k)
+        contour_neighbors = self.contour_neighbors(k)
         deg_v_k = len(contour_neighbors)
         if deg_v_k == 2:
             return 1 # Index in contour neighbors vector
-        else:
-            begin = 1 if self.stable[vk] else 2
-            for r in  range(begin, len(contour_neighbors)):
-                is_r = True
-                for r1 in range(r, len(contour_neighbors)):
-                    if not self.stable[contour_neighbors[r1]]:
-                        is_r = False
-                        break
-                if is_r:
-                    return r
-        return len(contour_neighbors)-1
\ No newline at end of file
+        begin = 1 if self.stable[vk] else 2
+        r = deg_v_k
+        while r > begin and self.stable[contour_neighbors[r-1]]:
+            r -= 1
+        if r == deg_v_k:
+            return deg_v_k - 1
+        return r
\ No newline at end of file
@@ -0,0 +1,128 @@
+import numpy as np
+
+import instances_preliminaries
+from csr_graph import CSRGraph, csr_from_edges
+from errors import InstanceFormatError
+from canonical_ordering import CanonicalOrdering, ordering_from_tuples
+
+# Binary instance file, opened with numpy.memmap so arrays are used straight from the page cache.
+# Layout: magic, header of int64 values and the sections, every section aligned to 8 bytes.
+#   indptr, indices            - CSR adjacency indexed by vertex id, neighbours of v are
+#                                indices[indptr[v]:indptr[v+1]], sorted
+#   order, rank,
+#   contour_offsets,
+#   contour_nodes              - canonical ordering (see CanonicalOrdering), optional
+#   x, y                       - int32 coordinates indexed by vertex id, optional
+INSTANCE_MAGIC = b'GDINST01'
+INSTANCE_HEADER = ['n', 'size', 'm', 'has_ordering', 'contour_size', 'has_positions']
+INSTANCE_SECTIONS = [
+    ('indptr', np.int64),
+    ('indices', np.int32),
+    ('order', np.int32),
+    ('rank', np.int32),
+    ('contour_offsets', np.int64),
+    ('contour_nodes', np.int32),
+    ('x', np.int32),
+    ('y', np.int32),
+]
+
+
+class StoredInstance(instances_preliminaries.PreparedInstance):
+    # Instance opened from a binary instance file. Graph, ordering and positions are views of the
+    # memory-mapped file, nothing is copied or unpickled. Can be passed to the algorithms like any
+    # PreparedInstance, networkx is only needed if the file has no canonical ordering.
+
+    def __init__(self, path):
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode='r')
+
+        if bytes(self.data[:len(INSTANCE_MAGIC)]) != INSTANCE_MAGIC:
+            raise InstanceFormatError('{path} is not an instance file'.format(path=path))
+
+        header_size = len(INSTANCE_HEADER) + 2 * len(INSTANCE_SECTIONS)
+        header = self.data[len(INSTANCE_MAGIC):len(INSTANCE_MAGIC) + 8 * header_size].view(np.int64)
+        self.header = dict(zip(INSTANCE_HEADER, header[:len(INSTANCE_HEADER)].tolist()))
+
+        self.sections = dict()
+        for i, (name, dtype) in enumerate(INSTANCE_SECTIONS):
+            offset, length = header[len(INSTANCE_HEADER) + 2 * i:len(INSTANCE_HEADER) + 2 * i + 2].tolist()
+            self.sections[name] = self.data[offset:offset + length * np.dtype(dtype).itemsize].view(dtype)
+
+        g = CSRGraph(self.sections['indptr'], self.sections['indices'], self.header['n'])
+        super().__init__(g)
+
+        if self.header['has_ordering']:
+            self._ordering = CanonicalOrdering(self.sections['order'], self.sections['contour_offsets'],
+                                               self.sections['contour_nodes'], self.sections['rank'])
+
+    @property
+    def embedding(self):
+        if self._embedding is None:
+            import networkx as nx
+            _, self._embedding = nx.check_planarity(self.g.to_networkx())
+        return self._embedding
+
+    def has_positions(self):
+        return bool(self.header['has_positions'])
+
+    # Stored coordinates as dict, for drawing and writing text formats
+    def positions(self):
+        x, y = self.sections['x'], self.sections['y']
+        return {v: (int(x[v]), int(y[v])) for v in self.g.nodes().tolist()}
+
+
+# Writing graph (networkx graph, PreparedInstance or StoredInstance) with its canonical ordering
+# and optionally positions to a binary instance file.
+def write_instance(path, g, pos=None, with_ordering=True):
+    instance = instances_preliminaries.prepare_instance(g)
+    g = instance.g
+
+    if isinstance(g, CSRGraph):
+        indptr, indices = g.indptr, g.indices
+    else:
+        edges = np.array(list(g.edges()), dtype=np.int32).reshape(-1, 2)
+        indptr, indices = csr_from_edges(edges[:, 0], edges[:, 1], max(g.nodes()) + 1)
+    size = len(indptr) - 1
+
+    arrays = dict((name, np.zeros(0, dtype=dtype)) for name, dtype in INSTANCE_SECTIONS)
+    arrays['indptr'] = indptr
+    arrays['indices'] = indices
+
+    if with_ordering:
+        ordering = instance.ordering
+        if not isinstance(ordering, CanonicalOrdering):
+            ordering = ordering_from_tuples(ordering)
+        arrays['order'] = ordering.order
+        arrays['rank'] = ordering.rank
+        arrays['contour_offsets'] = ordering.contour_offsets
+        arrays['contour_nodes'] = ordering.contour_nodes
+
+    if pos is not None:
+        arrays['x'] = np.zeros(size, dtype=np.int32)
+        arrays['y'] = np.zeros(size, dtype=np.int32)
+        for v, (x, y) in pos.items():
+            arrays['x'][v] = x
+            arrays['y'][v] = y
+
+    header = [g.number_of_nodes(), size, g.number_of_edges(), int(with_ordering),
+              len(arrays['contour_nodes']), int(pos is not None)]
+
+    offset = len(INSTANCE_MAGIC) + 8 * (len(INSTANCE_HEADER) + 2 * len(INSTANCE_SECTIONS))
+    sections = []
+    for name, dtype in INSTANCE_SECTIONS:
+        array = np.ascontiguousarray(arrays[name], dtype=dtype)
+        offset = (offset + 7) // 8 * 8
+        sections.append((offset, array))
+        header.extend([offset, len(array)])
+        offset += array.nbytes
+
+    with open(path, 'wb') as f:
+        f.write(INSTANCE_MAGIC)
+        f.write(np.array(header, dtype=np.int64).tobytes())
+        for offset, array in sections:
+            f.write(b'\0' * (offset - f.tell()))
+            array.tofile(f)
+
+
+def open_instance(path):
+    return StoredInstance(path)
@@ -1,45 +1,186 @@
+from array import array
 from collections import defaultdict
-import networkx as nx
-from random import randint
+import random
+import weakref
+import numpy as np
 
-from errors import NumberOfNodesError
+from errors import CanonicalOrderingError, NumberOfNodesError
+from domino_chains import ZTable
+from canonical_ordering import CanonicalOrdering
+from csr_graph import CSRGraph, csr_from_edges
 
-def generate_triangulated_graph(number_of_nodes):
-    if number_of_nodes < 3 or number_of_nodes is None:
+UNDEFINED = -1
+
+
+# Random triangulation as networkx graph, see generate_triangulation
+def generate_triangulated_graph(number_of_nodes, seed=None):
+    return generate_triangulation(number_of_nodes, seed).to_networkx()
+
+
+class Triangulation:
+    # Random stacked triangulation as flat arrays, built by generate_triangulation.
+    # Edge e is stored as two half-edges, 2e from edge_u[e] to edge_v[e] and 2e+1 back.
+    # head[h]                - vertex half-edge h points to
+    # ccw_next[h], cw_next[h] - next half-edge with the same tail in counterclockwise/clockwise order,
+    #                          triangle (1, 2, 3) is counterclockwise and (1, 2, n) is the outer face
+    # ordering               - canonical ordering for outer face (1, 2, n), CanonicalOrdering
+
+    def __init__(self, number_of_nodes, head, ccw_next, cw_next, ordering):
+        self.number_of_nodes = number_of_nodes
+        self.head = head
+        self.ccw_next = ccw_next
+        self.cw_next = cw_next
+        self.ordering = ordering
+        self.edge_u = head[1::2]
+        self.edge_v = head[0::2]
+
+    def to_networkx(self):
+        import networkx as nx
+        g = nx.Graph()
+        g.add_nodes_from(range(1, self.number_of_nodes + 1))
+        g.add_edges_from(zip(self.edge_u.tolist(), self.edge_v.tolist()))
+        return g
+
+    # Planar embedding given by the rotation arrays, without planarity test
+    def embedding(self):
+        head, cw_next = self.head.tolist(), self.cw_next.tolist()
+        first = dict()
+        for h in range(len(head)):
+            first.setdefault(head[h ^ 1], h)
+
+        import networkx as nx
+        embedding = nx.PlanarEmbedding()
+        embedding.set_data(dict((v, cw_order(head, cw_next, h)) for v, h in first.items()))
+        return embedding
+
+    def instance(self):
+        return GeneratedInstance(self)
+
+
+def cw_order(head, cw_next, first):
+    nbrs = [head[first]]
+    h = cw_next[first]
+    while h != first:
+        nbrs.append(head[h])
+        h = cw_next[h]
+    return nbrs
+
+
+# Random triangulation on nodes 1..number_of_nodes: starting from triangle (1, 2, 3), each next node is
+# put into a random inner face and connected to its corners, the last node is put into the outer face.
+# Faces are kept in a list, the chosen one is swapped with the last before removing it.
+# seed - seed of own random generator, module random is used when None
+def generate_triangulation(number_of_nodes, seed=None):
+    if number_of_nodes is None or number_of_nodes < 3:
         raise NumberOfNodesError("number of nodes must be greater than 3")
 
-    G = nx.Graph()
-    G.add_nodes_from([1, 2, 3])
-    G.add_edge(1, 2)
-    G.add_edge(2, 3)
-    G.add_edge(3, 1)
+    rng = random if seed is None else random.Random(seed)
+    n = number_of_nodes
+    number_of_half_edges = 2 * (3 * n - 6) if n > 3 else 6
+    number_of_faces = 3 * (n - 3) + 2
+
+    head = array('i', bytes(4 * number_of_half_edges))
+    ccw_next = array('i', bytes(4 * number_of_half_edges))
+    cw_next = array('i', bytes(4 * number_of_half_edges))
 
-    triangles = [(1, 2, 3)]
+    # face f is the triangle with half-edges face_edges[3f], face_edges[3f+1], face_edges[3f+2] on its
+    # boundary, counterclockwise; face_node[f] is the node put into it and its three new faces are
+    # face_children[f], +1, +2
+    face_edges = array('i', bytes(4 * 3 * number_of_faces))
+    face_node = array('i', [UNDEFINED]) * number_of_faces
+    face_children = array('i', [UNDEFINED]) * number_of_faces
+    # first_out[v] - half-edge from v to the first corner of the face v was put into, to the second and
+    # third one are first_out[v]+2 and first_out[v]+4
+    first_out = array('i', [UNDEFINED]) * (n + 1)
 
-    for iter in range(4,number_of_nodes):
-        chosen_triangle_index = randint(0, len(triangles)-1)
-        chosen_triangle = triangles[chosen_triangle_index]
-        next_node = iter
+    # triangle (1, 2, 3), its inner face is 0 and the outer face, traversed counterclockwise, is 1
+    head[0:6] = array('i', [2, 1, 3, 2, 1, 3])
+    for a, b in ((0, 5), (1, 2), (3, 4)):
+        ccw_next[a], cw_next[a], ccw_next[b], cw_next[b] = b, b, a, a
+    face_edges[0:6] = array('i', [0, 2, 4, 5, 3, 1])
 
-        # Add new node and edges
-        G.add_edge(chosen_triangle[0], next_node)
-        G.add_edge(chosen_triangle[1], next_node)
-        G.add_edge(chosen_triangle[2], next_node)
+    # Node v gets edges 3(v-3) to 3(v-3)+2 and faces 3v-10 to 3v-8
+    def put_into_face(v, f):
+        h01, h12, h20 = face_edges[3 * f], face_edges[3 * f + 1], face_edges[3 * f + 2]
+        e = 6 * (v - 3)
+        head[e], head[e + 1], head[e + 2], head[e + 3], head[e + 4], head[e + 5] = \
+            v, head[h20], v, head[h01], v, head[h12]
 
-        # Add new triangles
-        triangles.append((chosen_triangle[0], chosen_triangle[1], next_node))
-        triangles.append((chosen_triangle[1], chosen_triangle[2], next_node))
-        triangles.append((chosen_triangle[2], chosen_triangle[0], next_node))
+        # half-edge corner -> v goes right after corner's face edge in counterclockwise order
+        for out, after in ((e, h01), (e + 2, h12), (e + 4, h20)):
+            following = ccw_next[after]
+            ccw_next[after], cw_next[out] = out, after
+            ccw_next[out], cw_next[following] = following, out
+        ccw_next[e + 1], ccw_next[e + 3], ccw_next[e + 5] = e + 3, e + 5, e + 1
+        cw_next[e + 1], cw_next[e + 3], cw_next[e + 5] = e + 5, e + 1, e + 3
+        first_out[v] = e + 1
 
-        # Remove old one
-        del triangles[chosen_triangle_index]
+        face_node[f] = v
+        face_children[f] = 3 * v - 10
+        c = 9 * v - 30
+        face_edges[c], face_edges[c + 1], face_edges[c + 2] = h01, e + 2, e + 1
+        face_edges[c + 3], face_edges[c + 4], face_edges[c + 5] = h12, e + 4, e + 3
+        face_edges[c + 6], face_edges[c + 7], face_edges[c + 8] = h20, e, e + 5
 
-    G.add_edge(1, number_of_nodes)
-    G.add_edge(2, number_of_nodes)
-    G.add_edge(3, number_of_nodes)
+    inner_faces = [0]
+    for v in range(4, n):
+        i = int(rng.random() * len(inner_faces))
+        f = inner_faces[i]
+        inner_faces[i] = inner_faces[-1]
+        inner_faces[-1] = 3 * v - 10
+        inner_faces.append(3 * v - 9)
+        inner_faces.append(3 * v - 8)
+        put_into_face(v, f)
+    if n > 3:
+        put_into_face(n, 1)
 
+    ordering = stacked_canonical_ordering(n, head, ccw_next, face_node, face_children, first_out)
+    return Triangulation(n, np.frombuffer(head, dtype=np.int32), np.frombuffer(ccw_next, dtype=np.int32),
+                         np.frombuffer(cw_next, dtype=np.int32), ordering)
 
-    return G
+
+# Canonical ordering of triangulation built by generate_triangulation, read from its tree of faces.
+# Face with corners (a, b, c) and base edge (a, b), containing node d, is ordered as: face (a, b, d),
+# d, face (a, d, c), face (d, b, c). Contour neighbours of d are its neighbours counterclockwise from a to b.
+def stacked_canonical_ordering(n, head, ccw_next, face_node, face_children, first_out):
+    # half-edges from node to wp and to wq
+    contour_first = array('i', [UNDEFINED]) * (n + 1)
+    contour_last = array('i', [UNDEFINED]) * (n + 1)
+    contour_first[3], contour_last[3] = 4, 3
+
+    order = array('i', [1, 2])
+    # (face, r) - face with base edge from its corner r to corner r+1, (node, UNDEFINED) - node itself
+    stack = [(3, UNDEFINED), (0, 0)]
+    while stack:
+        f, r = stack.pop()
+        if r == UNDEFINED:
+            order.append(f)
+            continue
+        v = face_node[f]
+        if v == UNDEFINED:
+            continue
+        c = face_children[f]
+        contour_first[v] = first_out[v] + 2 * r
+        contour_last[v] = first_out[v] + 2 * ((r + 1) % 3)
+        stack.append((c + (r + 1) % 3, 2))
+        stack.append((c + (r + 2) % 3, 1))
+        stack.append((v, UNDEFINED))
+        stack.append((c + r, 0))
+    if n > 3:
+        order.append(n)
+        contour_first[n], contour_last[n] = first_out[n], first_out[n] + 4
+
+    contour_offsets = array('q', [0, 0, 0])
+    contour_nodes = array('i')
+    for v in order[2:]:
+        h, last = contour_first[v], contour_last[v]
+        contour_nodes.append(head[h])
+        while h != last:
+            h = ccw_next[h]
+            contour_nodes.append(head[h])
+        contour_offsets.append(len(contour_nodes))
+    return CanonicalOrdering(np.frombuffer(order, dtype=np.int32), np.frombuffer(contour_offsets, dtype=np.int64),
+                             np.frombuffer(contour_nodes, dtype=np.int32))
 
 
 def inner_get_canonical_ordering(embedding, outer_face):
@@ -72,10 +213,12 @@ def inner_get_canonical_ordering(embedding, outer_face):
 
     Returns
     -------
-    ordering : list
-        A list of tuples `(vk, wp_wq)`. Here `vk` is the node at this position
-        in the canonical ordering. The element `wp_wq` is a list of nodes that
-        make up the outer face of G_k.
+    ordering : CanonicalOrdering or list
+        Flat arrays, `ordering[k]` gives the tuple `(vk, wp_wq)`. Here `vk` is
+        the node at this position in the canonical ordering. The element
+        `wp_wq` is a list of nodes that make up the outer face of G_k.
+        Graphs with other than integer nodes (e.g. strings) get the list of
+        `(vk, wp_wq)` tuples instead.
 
     """
     v1 = outer_face[0]
@@ -116,14 +259,16 @@ def inner_get_canonical_ordering(embedding, outer_face):
                 chords[v] += 1
                 ready_to_pick.discard(v)
 
-    # Initialize canonical_ordering
-    canonical_ordering = [None] * len(embedding.nodes())  # type: list
-    canonical_ordering[0] = (v1, [])
-    canonical_ordering[1] = (v2, [])
+    # Initialize canonical_ordering, contour neighbors are collected in one
+    # flat list, each wp_wq reversed, as k goes down
+    n = len(embedding.nodes())
+    order = [v1, v2] + [None] * (n - 2)
+    contour_lengths = [0] * n
+    contour_nodes = []
     ready_to_pick.discard(v1)
     ready_to_pick.discard(v2)
 
-    for k in range(len(embedding.nodes()) - 1, 1, -1):
+    for k in range(n - 1, 1, -1):
         # 1. Pick v from ready_to_pick
         v = ready_to_pick.pop()
         marked_nodes.add(v)
@@ -193,13 +338,294 @@ def inner_get_canonical_ordering(embedding, outer_face):
                             chords[nbr] += 1
                             ready_to_pick.discard(nbr)
         # Set the canonical ordering node and the list of contour neighbors
-        canonical_ordering[k] = (v, wp_wq)
+        order[k] = v
+        contour_lengths[k] = len(wp_wq)
+        contour_nodes.extend(reversed(wp_wq))
+
+    contour_offsets = np.zeros(n + 1, dtype=np.int64)
+    contour_offsets[1:] = np.cumsum(contour_lengths)
+    contour_nodes.reverse()
+    if not has_integer_nodes(embedding):
+        offsets = contour_offsets.tolist()
+        return [(order[k], contour_nodes[offsets[k]:offsets[k + 1]]) for k in range(n)]
+    return CanonicalOrdering(np.array(order, dtype=np.int32), contour_offsets,
+                             np.array(contour_nodes, dtype=np.int32))
+
+# Rotation system of embedding as flat integer arrays. Half-edges from v are
+# indptr[v]..indptr[v+1]-1 in the order of embedding.neighbors_cw_order(v), head[h] is the neighbour,
+# cw_next[h] / ccw_next[h] the next half-edge around v clockwise / counterclockwise.
+def rotation_arrays(embedding):
+    adjacency = dict(embedding.adjacency())
+    first_nbr = dict(embedding.nodes(data='first_nbr'))
+    size = max(adjacency) + 1
+    degrees = np.zeros(size, dtype=np.int64)
+    head = []
+    for v in sorted(adjacency):
+        nbrs = adjacency[v]
+        first = first_nbr[v]
+        nbr = first
+        while True:
+            head.append(nbr)
+            nbr = nbrs[nbr]['cw']
+            if nbr == first:
+                break
+        degrees[v] = len(nbrs)
+
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(degrees)
+    half_edges = np.arange(len(head), dtype=np.int64)
+    cw_next = half_edges + 1
+    ccw_next = half_edges - 1
+    has_nbrs = degrees > 0
+    cw_next[indptr[1:][has_nbrs] - 1] = indptr[:-1][has_nbrs]
+    ccw_next[indptr[:-1][has_nbrs]] = indptr[1:][has_nbrs] - 1
+    return indptr, np.array(head, dtype=np.int32), cw_next, ccw_next
+
+
+def has_integer_nodes(embedding):
+    return all(isinstance(v, int) and v >= 0 for v in embedding)
+
+
+# Same algorithm as inner_get_canonical_ordering on the rotation_arrays of the embedding,
+# graphs with other than integer nodes go to inner_get_canonical_ordering itself and get its list of tuples.
+# rotation - rotation_arrays(embedding) when they are reused for more outer faces
+def fast_canonical_ordering(embedding, outer_face, rotation=None):
+    if not has_integer_nodes(embedding):
+        return inner_get_canonical_ordering(embedding, outer_face)
+    if rotation is None:
+        rotation = rotation_arrays(embedding)
+    indptr, head, _, ccw_next = rotation
+    return rotation_canonical_ordering(indptr, head, ccw_next, outer_face, len(embedding))
+
+
+# Same algorithm as inner_get_canonical_ordering (and the same result) over rotation arrays instead of
+# the PlanarEmbedding, n is the number of nodes. Chord counts and outer face neighbours are flat lists
+# indexed by node, UNDEFINED in outer_face_cw_nbr / outer_face_ccw_nbr is a missing key.
+# ready_to_pick and new_face_nodes stay sets and get the same updates in the same order, so nodes
+# are picked in the same order as well.
+def rotation_canonical_ordering(indptr, head, ccw_next, outer_face, n):
+    indptr, head, ccw_next = indptr.tolist(), head.tolist(), ccw_next.tolist()
+    size = len(indptr) - 1
+
+    v1 = outer_face[0]
+    v2 = outer_face[1]
+    chords = [0] * size
+    marked = [False] * size
+    ready_to_pick = set(outer_face)
+
+    outer_face_ccw_nbr = [UNDEFINED] * size
+    prev_nbr = v2
+    for idx in range(2, len(outer_face)):
+        outer_face_ccw_nbr[prev_nbr] = outer_face[idx]
+        prev_nbr = outer_face[idx]
+    outer_face_ccw_nbr[prev_nbr] = v1
+
+    outer_face_cw_nbr = [UNDEFINED] * size
+    prev_nbr = v1
+    for idx in range(len(outer_face) - 1, 0, -1):
+        outer_face_cw_nbr[prev_nbr] = outer_face[idx]
+        prev_nbr = outer_face[idx]
+
+    # on_outer_face[v] - v is not marked and is a key of outer_face_ccw_nbr or v1
+    on_outer_face = [False] * size
+    for v in outer_face:
+        on_outer_face[v] = True
+
+    for v in outer_face:
+        for nbr in head[indptr[v]:indptr[v + 1]]:
+            if on_outer_face[nbr] and outer_face_ccw_nbr[v] != nbr and outer_face_cw_nbr[v] != nbr:
+                chords[v] += 1
+                ready_to_pick.discard(v)
+
+    order = [v1, v2] + [None] * (n - 2)
+    contour_lengths = [0] * n
+    contour_nodes = []
+    ready_to_pick.discard(v1)
+    ready_to_pick.discard(v2)
+
+    # Inputs that are not internally triangulated or have another outer face raise CanonicalOrderingError
+    for k in range(n - 1, 1, -1):
+        if not ready_to_pick:
+            raise CanonicalOrderingError('no vertex to remove for v_{k}, the graph is not internally triangulated '
+                                         'or {face} is not its outer face'.format(k=k + 1, face=outer_face))
+        v = ready_to_pick.pop()
+        on_outer_face[v] = False
+
+        # wp and wq are the two neighbours of v on the outer face, h_wp is the half-edge to wp
+        wp = UNDEFINED
+        wq = UNDEFINED
+        h_wp = UNDEFINED
+        for h in range(indptr[v], indptr[v + 1]):
+            nbr = head[h]
+            if not on_outer_face[nbr]:
+                continue
+            if nbr == v1:
+                wp, h_wp = v1, h
+            elif nbr == v2:
+                wq = v2
+            elif outer_face_cw_nbr[nbr] == v:
+                wp, h_wp = nbr, h
+            else:
+                wq = nbr
+            if wp != UNDEFINED and wq != UNDEFINED:
+                break
+        if wp == UNDEFINED or wq == UNDEFINED:
+            raise CanonicalOrderingError('{v} does not have two neighbours on the outer face of G_{k}'.format(v=v, k=k))
+
+        # Walk from wp to wq counterclockwise around v, passing every neighbour at most once
+        wp_wq = [wp]
+        nbr = wp
+        h = h_wp
+        steps = indptr[v + 1] - indptr[v]
+        while nbr != wq:
+            h = ccw_next[h]
+            steps -= 1
+            if steps == 0 or h == h_wp:
+                raise CanonicalOrderingError('{wq} does not follow {wp} around {v}, the graph is not internally '
+                                             'triangulated'.format(wq=wq, wp=wp, v=v))
+            next_nbr = head[h]
+            wp_wq.append(next_nbr)
+            outer_face_cw_nbr[nbr] = next_nbr
+            outer_face_ccw_nbr[next_nbr] = nbr
+            on_outer_face[next_nbr] = True
+            nbr = next_nbr
+
+        if len(wp_wq) == 2:
+            chords[wp] -= 1
+            if chords[wp] == 0:
+                ready_to_pick.add(wp)
+            chords[wq] -= 1
+            if chords[wq] == 0:
+                ready_to_pick.add(wq)
+        else:
+            new_face_nodes = set(wp_wq[1:-1])
+            for w in new_face_nodes:
+                ready_to_pick.add(w)
+                for nbr in head[indptr[w]:indptr[w + 1]]:
+                    if on_outer_face[nbr] and outer_face_ccw_nbr[w] != nbr and outer_face_cw_nbr[w] != nbr:
+                        chords[w] += 1
+                        ready_to_pick.discard(w)
+                        if nbr not in new_face_nodes:
+                            chords[nbr] += 1
+                            ready_to_pick.discard(nbr)
+
+        order[k] = v
+        contour_lengths[k] = len(wp_wq)
+        contour_nodes.extend(reversed(wp_wq))
+
+    contour_offsets = np.zeros(n + 1, dtype=np.int64)
+    contour_offsets[1:] = np.cumsum(contour_lengths)
+    return CanonicalOrdering(np.array(order, dtype=np.int32), contour_offsets,
+                             np.array(contour_nodes[::-1], dtype=np.int32))
 
-    return canonical_ordering
 
 def get_canonical_ordering(g):
-    # get planar embedding
-    _, embedding = nx.check_planarity(g)
-    max_node = len(g)
-    ordering = inner_get_canonical_ordering(embedding, [1, 2, max_node])
-    return ordering
+    return prepare_instance(g).ordering
+
+
+class PreparedInstance:
+    # Graph together with everything the drawing algorithms derive from it: planar embedding,
+    # canonical ordering and ZTable. Each of them is computed once, on first use, so one instance can be
+    # passed to AAlgorithm, BAlgorithm and combinatorial_embedding_to_pos instead of the graph.
+    # outer_face - (v1, v2, vn) for canonical ordering, [1, 2, max_node] by default
+    # Instances kept by prepare_instance only refer to their graph weakly (weak=True), otherwise the cache
+    # would keep every graph alive. Such an instance is resolved to its graph when it is pickled.
+
+    def __init__(self, g, outer_face=None, weak=False):
+        self.graph = None if weak else g
+        self.graph_ref = weakref.ref(g) if weak else None
+        self.outer_face = [1, 2, len(g)] if outer_face is None else outer_face
+        self._embedding = None
+        self._ordering = None
+        self._z_table = None
+
+    @property
+    def embedding(self):
+        if self._embedding is None:
+            import networkx as nx
+            _, self._embedding = nx.check_planarity(self.g)
+        return self._embedding
+
+    @property
+    def ordering(self):
+        if self._ordering is None:
+            self._ordering = fast_canonical_ordering(self.embedding, self.outer_face)
+        return self._ordering
+
+    @property
+    def z_table(self):
+        if self._z_table is None:
+            self._z_table = ZTable(self.ordering)
+        return self._z_table
+
+    @property
+    def g(self):
+        return self.graph if self.graph_ref is None else self.graph_ref()
+
+    def __len__(self):
+        return len(self.g)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if self.graph_ref is not None:
+            state['graph'] = self.graph_ref()
+            state['graph_ref'] = None
+        return state
+
+
+class GeneratedInstance(PreparedInstance):
+    # Instance of a Triangulation. The graph is a CSRGraph over its edge arrays and the embedding and
+    # canonical ordering are the ones built together with it, so no planarity test is run.
+
+    def __init__(self, triangulation):
+        self.triangulation = triangulation
+        n = triangulation.number_of_nodes
+        indptr, indices = csr_from_edges(triangulation.edge_u, triangulation.edge_v, n + 1)
+        super().__init__(CSRGraph(indptr, indices, n))
+        self._ordering = triangulation.ordering
+
+    @property
+    def embedding(self):
+        if self._embedding is None:
+            self._embedding = self.triangulation.embedding()
+        return self._embedding
+
+
+# Prepared instances of graphs with the default outer face, id(g) -> (fingerprint, instance).
+# Cached instances refer to their graph weakly and a finalizer drops the entry when the graph is collected,
+# evict_prepared_instance drops it earlier.
+prepared_instances = dict()
+
+
+# Structure of g, a graph with other edges or relabelled nodes has another fingerprint. The edge list is
+# hashed in iteration order, so the same edges added in another order only cost a miss. A fraction of the
+# planarity test it saves.
+def graph_fingerprint(g):
+    return g.number_of_nodes(), hash(tuple(g.edges()))
+
+
+# Getting PreparedInstance for graph g, from cache if the graph was not changed since.
+def prepare_instance(g, cache=True):
+    if isinstance(g, PreparedInstance):
+        return g
+    if not cache:
+        return PreparedInstance(g)
+
+    fingerprint = graph_fingerprint(g)
+    entry = prepared_instances.get(id(g))
+    if entry is not None and entry[0] == fingerprint and entry[1].g is g:
+        return entry[1]
+
+    instance = PreparedInstance(g, weak=True)
+    if entry is None:
+        weakref.finalize(g, prepared_instances.pop, id(g), None)
+    prepared_instances[id(g)] = (fingerprint, instance)
+    return instance
+
+
+# Removing g from cache of prepared instances, or all of them when g is None.
+def evict_prepared_instance(g=None):
+    if g is None:
+        prepared_instances.clear()
+    else:
+        prepared_instances.pop(id(g), None)
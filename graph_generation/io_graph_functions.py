@@ -1,5 +1,5 @@
 import networkx as nx
-import matplotlib.pyplot as plt
+import numpy as np
 from shift_algorithm import combinatorial_embedding_to_pos
 
 def save_to_file(graph=None, filepath=''):
@@ -8,30 +8,64 @@ def save_to_file(graph=None, filepath=''):
 def read_from_file(filepath):
     return nx.read_gpickle(filepath)
 
-def write_graph_format_txt(g, pos, path):
+# Text formats of a drawn graph, vertices are 1..n.
+# Version 1 (legacy): n, n lines "x, y" and the n x n adjacency matrix.
+# Version 2: header "graph_format 2", line "n m", n lines "x y" and m lines "u v" of the edge list.
+GRAPH_FORMAT_MATRIX = 1
+GRAPH_FORMAT_EDGE_LIST = 2
+GRAPH_FORMAT_HEADER = 'graph_format'
+
+
+def write_graph_format_txt(g, pos, path, version=GRAPH_FORMAT_EDGE_LIST):
     n = len(g)
-    f = open(path, "w")
-    f.write('{}\n'.format(n))
+    if version == GRAPH_FORMAT_MATRIX:
+        write_graph_format_matrix_txt(g, pos, path)
+        return
 
-    for i in range(1, n+1):
-        f.write('{x}, {y}\n'.format(x=pos[i][0], y=pos[i][1]))
+    positions = np.array([pos[i] for i in range(1, n + 1)], dtype=np.int64).reshape(-1, 2)
+    edges = np.array(list(g.edges()), dtype=np.int64).reshape(-1, 2)
+    with open(path, "w") as f:
+        f.write('{header} {version}\n'.format(header=GRAPH_FORMAT_HEADER, version=GRAPH_FORMAT_EDGE_LIST))
+        f.write('{n} {m}\n'.format(n=n, m=len(edges)))
+        np.savetxt(f, positions, fmt='%d')
+        np.savetxt(f, edges, fmt='%d')
 
-    for i in range(1, n+1):
-        for k in range(1, n + 1):
-            if g.has_edge(i, k):
-                f.write('1 ')
-            else:
-                f.write('0 ')
-        f.write('\n')
-    f.close()
 
+def write_graph_format_matrix_txt(g, pos, path):
+    n = len(g)
+    with open(path, "w") as f:
+        f.write('{}\n'.format(n))
+        f.write(''.join('{x}, {y}\n'.format(x=pos[i][0], y=pos[i][1]) for i in range(1, n + 1)))
+
+        for i in range(1, n + 1):
+            f.write(''.join('1 ' if g.has_edge(i, k) else '0 ' for k in range(1, n + 1)))
+            f.write('\n')
+
+
+# Loading graph and positions, the format version is detected from the first line.
 def load_graph_from_format_txt(path):
+    with open(path, "r") as f:
+        line = f.readline()
+        if not line.startswith(GRAPH_FORMAT_HEADER):
+            return load_graph_from_format_matrix_txt(f, int(line))
+
+        n, m = (int(value) for value in f.readline().split())
+        values = np.array(f.read().split(), dtype=np.int64)
+
+    positions = values[:2 * n].reshape(n, 2)
+    edges = values[2 * n:2 * (n + m)].reshape(m, 2)
+
+    g = nx.Graph()
+    g.add_nodes_from(range(1, n + 1))
+    g.add_edges_from(edges.tolist())
+    pos = dict(zip(range(1, n + 1), map(tuple, positions.tolist())))
+    return g, pos
+
+
+def load_graph_from_format_matrix_txt(f, n):
     g = nx.Graph()
     pos = dict()
 
-    f = open(path, "r")
-    line = f.readline()
-    n = int(line)
     for i in range(1, n + 1):
         line = f.readline()
         temp = line.split(',')
@@ -41,13 +75,21 @@ def load_graph_from_format_txt(path):
         line = f.readline()
         temp = line.split(' ')
         for k in range(1, n + 1):
-            if temp[k] == '1' and not g.has_edge(i, k):
+            if temp[k - 1] == '1' and not g.has_edge(i, k):
                 g.add_edge(i, k)
 
     return g, pos
 
+
+# Converting graph file between format versions.
+def convert_graph_format_txt(source_path, target_path, version=GRAPH_FORMAT_EDGE_LIST):
+    g, pos = load_graph_from_format_txt(source_path)
+    write_graph_format_txt(g, pos, target_path, version)
+
 #==================== Graph plotting ===================
+# matplotlib is imported by the plotting functions, so reading and writing graphs loads no plotting code
 def draw_graph(g, pos = None):
+    import matplotlib.pyplot as plt
     if pos is None:
         pos = combinatorial_embedding_to_pos(g)
 
@@ -58,6 +100,13 @@ def draw_graph(g, pos = None):
     plt.show()
 
 def save_graph_pic_to_file(g, output_filename, pos = None, color=None ):
+    import matplotlib.pyplot as plt
+    fig = plt.figure()
+    save_graph_pic_to_figure(fig, g, output_filename, pos=pos, color=color)
+    plt.close(fig)
+
+# Same picture as save_graph_pic_to_file, drawn into fig which is cleared first, so one figure can be reused
+def save_graph_pic_to_figure(fig, g, output_filename, pos = None, color=None):
     if pos is None:
         pos = combinatorial_embedding_to_pos(g)
     color_map = []
@@ -67,10 +116,11 @@ def save_graph_pic_to_file(g, output_filename, pos = None, color=None ):
         else:
             color_map.append(color)
 
-    fig, ax = plt.subplots()
+    fig.clf()
+    ax = fig.add_subplot()
     nx.draw(g, pos, ax=ax, node_color=color_map, with_labels=True)
 
-    limits = plt.axis('on')  # turns on axis
+    ax.axis('on')  # turns on axis
     ax.tick_params(left=True, bottom=True, labelleft=True, labelbottom=True)
 
-    plt.savefig(output_filename)
\ No newline at end of file
+    fig.savefig(output_filename)
\ No newline at end of file
@@ -0,0 +1,98 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Value
+
+import instances_preliminaries
+from graph_algorithms import AAlgorithm
+
+# Search for the outer face (v1, v2, vn) giving the narrowest drawing.
+# Every half-edge (u, v) of the embedding gives a candidate, the face traverse_face(u, v) as outer face with
+# v1 = u, v2 = v. Candidates are run in a pool of workers, the narrowest width found so far is shared
+# between them. Width of a drawing only grows while vertices are inserted (steps), so a run whose partial
+# width reaches the best width can not end narrower and is aborted right away.
+
+UNBOUNDED_WIDTH = 2 ** 62
+
+# State of a search worker, set by init_search_worker
+search_instance = None
+search_rotation = None
+search_algorithm = None
+search_best_width = None
+
+
+class OuterFaceSearchResult:
+    # outer_face, ordering, pos, width, height - narrowest drawing found
+    # candidates - number of candidates tried, aborted - how many of them were aborted early
+
+    def __init__(self, outer_face, ordering, pos, width, height, candidates, aborted):
+        self.outer_face = outer_face
+        self.ordering = ordering
+        self.pos = pos
+        self.width = width
+        self.height = height
+        self.candidates = candidates
+        self.aborted = aborted
+
+
+# Triangular faces (u, v, w) of embedding with u, v a half-edge, all of them or a sample of max_candidates.
+# The default outer face [1, 2, n] goes first if it is a candidate, so it sets the first bound.
+def candidate_outer_faces(embedding, max_candidates=None, seed=0):
+    faces = []
+    for u, v in embedding.edges():
+        face = embedding.traverse_face(u, v)
+        if len(face) == 3:
+            faces.append(face)
+
+    default = [1, 2, embedding.number_of_nodes()]
+    if max_candidates is not None and len(faces) > max_candidates:
+        faces = random.Random(seed).sample(faces, max_candidates)
+    if default in faces:
+        faces.remove(default)
+        faces.insert(0, default)
+    return faces
+
+
+def init_search_worker(g, algorithm, best_width):
+    global search_instance, search_rotation, search_algorithm, search_best_width
+    search_instance = instances_preliminaries.prepare_instance(g)
+    search_algorithm = algorithm
+    search_best_width = best_width
+    # rotation arrays are shared by the canonical orderings of all candidates
+    search_rotation = None
+    if instances_preliminaries.has_integer_nodes(search_instance.embedding):
+        search_rotation = instances_preliminaries.rotation_arrays(search_instance.embedding)
+
+
+# Drawing for outer_face as (outer_face, ordering, pos, width, height), None when it was aborted
+def run_candidate(outer_face):
+    ordering = instances_preliminaries.fast_canonical_ordering(search_instance.embedding, outer_face, search_rotation)
+    alg = search_algorithm()
+    for step in alg.steps(search_instance, ordering=ordering):
+        if step.width >= search_best_width.value:
+            return None
+
+    width, height = alg.pos.width(), alg.pos.height()
+    with search_best_width.get_lock():
+        if width < search_best_width.value:
+            search_best_width.value = width
+    return outer_face, ordering, alg.drawing(), width, height
+
+
+# Narrowest drawing of g by algorithm (AAlgorithm or BAlgorithm class) over candidate outer faces.
+# workers - number of worker processes, all cores by default, 1 runs the search in this process
+def search_outer_face(g, algorithm=AAlgorithm, workers=None, max_candidates=None, seed=0, chunk_size=4):
+    instance = instances_preliminaries.prepare_instance(g)
+    faces = candidate_outer_faces(instance.embedding, max_candidates, seed)
+    best_width = Value('q', UNBOUNDED_WIDTH)
+
+    if workers == 1:
+        init_search_worker(instance, algorithm, best_width)
+        results = [run_candidate(face) for face in faces]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_search_worker,
+                                 initargs=(instance, algorithm, best_width)) as executor:
+            results = list(executor.map(run_candidate, faces, chunksize=chunk_size))
+
+    finished = [result for result in results if result is not None]
+    outer_face, ordering, pos, width, height = min(finished, key=lambda result: result[3])
+    return OuterFaceSearchResult(outer_face, ordering, pos, width, height, len(faces), len(faces) - len(finished))
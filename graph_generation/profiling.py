@@ -0,0 +1,128 @@
+import json
+import time
+
+# Opt-in instrumentation of a GraphDrawingAlgorithm. attach() replaces the instrumented methods of one
+# algorithm instance by timing and counting wrappers, the class is not touched, so an algorithm without
+# a profiler runs the plain methods and pays nothing.
+#   timers     - total seconds and calls of place_kth, get_y_prime, shift_vertex, update_outer_face, check_visible
+#   counters   - totals, e.g. shifts, contour vertices moved, segment tests of check_visible
+#   histograms - value -> number of occurrences, e.g. contour vertices moved per shift
+#   series     - (k, value) sampled every sample_every insertions, e.g. contour length over time
+# check_visible only runs in debug mode of AAlgorithm, so its counters are missing from other runs, the report
+# says so in notes.
+
+PROFILED_METHODS = ['place_kth', 'get_y_prime', 'shift_vertex', 'update_outer_face', 'check_visible']
+
+PROFILE_NOTES = {
+    'check_visible_segment_tests': 'only counted in debug runs of AAlgorithm, check_visible is not called otherwise',
+}
+
+
+class AlgorithmProfiler:
+
+    def __init__(self, sample_every=1):
+        self.sample_every = sample_every
+        self.algorithm = None
+        self.timers = dict()
+        self.counters = dict()
+        self.histograms = dict()
+        self.series = dict()
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, value):
+        histogram = self.histograms.setdefault(name, dict())
+        histogram[value] = histogram.get(value, 0) + 1
+
+    def sample(self, name, k, value):
+        if k % self.sample_every == 0:
+            self.series.setdefault(name, []).append((k, value))
+
+    def add_time(self, name, seconds):
+        timer = self.timers.setdefault(name, [0.0, 0])
+        timer[0] += seconds
+        timer[1] += 1
+
+    def attach(self, algorithm):
+        self.algorithm = algorithm
+        algorithm.profiler = self
+        for name in PROFILED_METHODS:
+            setattr(algorithm, name, self.timed(name, getattr(algorithm, name)))
+
+        # Counters are collected around the timed methods
+        shift_vertex = algorithm.shift_vertex
+        get_y_prime = algorithm.get_y_prime
+        update_outer_face = algorithm.update_outer_face
+        check_visible = algorithm.check_visible
+
+        def counted_shift_vertex(v_k, wq):
+            moved = sum(1 for _ in algorithm.contour.nodes_from(wq))
+            self.count('shifts')
+            self.count('contour_vertices_moved', moved)
+            self.observe('contour_vertices_moved_per_shift', moved)
+            shift_vertex(v_k, wq)
+
+        # Visibility is solved exactly, so there are no retries. Probes are the contour neighbours the bound is
+        # computed from, lift is how far y had to go above the initial guess.
+        def counted_get_y_prime(x_k, begin_y, k):
+            y_k = get_y_prime(x_k, begin_y, k)
+            probes = len(algorithm.ordering.contour_neighbors(k))
+            self.count('visibility_probes', probes)
+            self.observe('visibility_probes_per_vertex', probes)
+            self.observe('visibility_lift', y_k - begin_y)
+            return y_k
+
+        def counted_update_outer_face(k):
+            update_outer_face(k)
+            self.sample('contour_length', k, len(algorithm.contour))
+
+        # Segment tests of a check_visible call, counted by check_visible itself in algorithm.segment_tests
+        def counted_check_visible(x_k, y_k, k):
+            segment_tests = algorithm.segment_tests
+            visible = check_visible(x_k, y_k, k)
+            tests = algorithm.segment_tests - segment_tests
+            self.count('check_visible_calls')
+            self.count('check_visible_segment_tests', tests)
+            self.observe('check_visible_segment_tests_per_call', tests)
+            if not visible:
+                self.count('check_visible_hits')
+            return visible
+
+        algorithm.shift_vertex = counted_shift_vertex
+        algorithm.get_y_prime = counted_get_y_prime
+        algorithm.update_outer_face = counted_update_outer_face
+        algorithm.check_visible = counted_check_visible
+        return self
+
+    def timed(self, name, method):
+        def timed_method(*args):
+            start_time = time.perf_counter()
+            value = method(*args)
+            self.add_time(name, time.perf_counter() - start_time)
+            return value
+        return timed_method
+
+    # Structured report, phase times of the last run of the algorithm included
+    def report(self):
+        histograms = dict()
+        for name, histogram in self.histograms.items():
+            total = sum(histogram.values())
+            histograms[name] = {
+                'count': total,
+                'mean': sum(value * count for value, count in histogram.items()) / total,
+                'max': max(histogram),
+                'values': dict((str(value), count) for value, count in sorted(histogram.items())),
+            }
+        return {
+            'phases': dict(self.algorithm.phase_times) if self.algorithm is not None else dict(),
+            'timers': dict((name, {'seconds': seconds, 'calls': calls}) for name, (seconds, calls) in self.timers.items()),
+            'counters': dict(self.counters),
+            'histograms': histograms,
+            'series': dict((name, [list(point) for point in points]) for name, points in self.series.items()),
+            'notes': dict(PROFILE_NOTES),
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=1)
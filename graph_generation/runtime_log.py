@@ -0,0 +1,83 @@
+import queue
+import threading
+
+# Runtime log of a drawing algorithm run.
+# LOG_EVENTS - one JSON object per line for every inserted vertex, with its neighbour span and the contour delta:
+#              {"k": k, "v": v_k, "wp": wp, "wq": wq, "covered": [wp+1, ..., wq-1]}, v_k replaces the covered
+#              vertices between wp and wq. Every vertex is covered at most once, so the log is O(n) bytes.
+# LOG_FULL   - the text lines of earlier versions with the whole contour C_k-1 for every vertex, O(n^2) bytes.
+# Lines are collected in a buffer and written in chunks of buffer_size lines, by a writer thread when
+# background is set, so neither formatting of big lines nor the disk is on the algorithm loop.
+LOG_OFF = 0
+LOG_EVENTS = 1
+LOG_FULL = 2
+
+LOG_SENTINEL = None
+
+
+class RuntimeLog:
+
+    def __init__(self, path, verbosity=LOG_EVENTS, mode='w', buffer_size=4096, background=True):
+        self.verbosity = verbosity
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.f = open(path, mode)
+        self.queue = None
+        self.writer = None
+        if background:
+            self.queue = queue.Queue(maxsize=16)
+            self.writer = threading.Thread(target=self.write_chunks, daemon=True)
+            self.writer.start()
+
+    def write_chunks(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is LOG_SENTINEL:
+                return
+            self.f.write(chunk)
+
+    def write(self, line):
+        self.buffer.append(line)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        chunk = ''.join(self.buffer)
+        self.buffer = []
+        if self.queue is not None:
+            self.queue.put(chunk)
+        else:
+            self.f.write(chunk)
+
+    # kth vertex v_k is inserted on top of contour_neighbors, contour is C_k-1
+    def vertex(self, k, v_k, contour_neighbors, contour):
+        if self.verbosity >= LOG_FULL:
+            self.write('Node: {node}, neighbours: {neighbours}, outer_face: {outer_face}\n'.format(
+                node=v_k, neighbours=contour_neighbors, outer_face=contour))
+        else:
+            self.write('{{"k": {k}, "v": {v}, "wp": {wp}, "wq": {wq}, "covered": {covered}}}\n'.format(
+                k=k, v=v_k, wp=contour_neighbors[0], wq=contour_neighbors[-1], covered=contour_neighbors[1:-1]))
+
+    def size(self, width, height):
+        if self.verbosity >= LOG_FULL:
+            self.write('Width: {width}, Height: {height}\n'.format(width=width, height=height))
+        else:
+            self.write('{{"width": {width}, "height": {height}}}\n'.format(width=width, height=height))
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.queue.put(LOG_SENTINEL)
+            self.writer.join()
+        self.f.close()
+
+
+# Log of a run with output_path, runtime{suffix}.log for LOG_FULL and runtime{suffix}.jsonl for LOG_EVENTS
+def open_runtime_log(output_path, suffix, verbosity, append=False):
+    if output_path is None or verbosity == LOG_OFF:
+        return None
+    extension = 'log' if verbosity >= LOG_FULL else 'jsonl'
+    path = '{output_path}/runtime{suffix}.{extension}'.format(output_path=output_path, suffix=suffix, extension=extension)
+    return RuntimeLog(path, verbosity, 'a' if append else 'w')
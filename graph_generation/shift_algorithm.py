@@ -1,9 +1,13 @@
-import networkx as nx
+import numpy as np
 from collections import defaultdict
+from canonical_ordering import CanonicalOrdering
+from coordinates import CoordinateStore
 from instances_preliminaries import generate_triangulated_graph, get_canonical_ordering
 
+UNDEFINED = -1
 
-def combinatorial_embedding_to_pos(g):
+
+def combinatorial_embedding_to_pos(g, ordering=None):
     """Assigns every node a (x, y) position based on the given embedding
 
     The algorithm iteratively inserts nodes of the input graph in a certain
@@ -12,19 +16,23 @@ def combinatorial_embedding_to_pos(g):
     positions during the node placements and calculating the absolute positions
     at the end. For more information see [1]_.
 
+    All state is kept in integer arrays indexed by the rank k of a node in the
+    canonical ordering, absolute positions are resolved for all nodes at once
+    by summing offsets along the paths of the tree (pointer jumping).
+
     Parameters
     ----------
-    embedding : nx.PlanarEmbedding
-        This defines the order of the edges
+    g : nx.Graph or PreparedInstance
+        Planar triangulated graph
 
-    fully_triangulate : bool
-        If set to True the algorithm adds edges to a copy of the input
-        embedding and makes it chordal.
+    ordering : CanonicalOrdering or list of (vk, [wp, ..., wq]) tuples
+        Canonical ordering of g, computed from g if it is not given
 
     Returns
     -------
-    pos : dict
-        Maps each node to a tuple that defines the (x, y) position
+    pos : CoordinateStore or dict
+        Maps each node to a tuple that defines the (x, y) position, a
+        CoordinateStore for a CanonicalOrdering (integer nodes), a dict otherwise
 
     References
     ----------
@@ -33,94 +41,99 @@ def combinatorial_embedding_to_pos(g):
         http://citeseerx.ist.psu.edu/viewdoc/summary?doi=10.1.1.51.6677
 
     """
-    # The following dicts map a node to another node
-    # If a node is not in the key set it means that the node is not yet in G_k
-    # If a node maps to None then the corresponding subtree does not exist
-    left_t_child = {}
-    right_t_child = {}
+    if ordering is None:
+        ordering = get_canonical_ordering(g)
+    order, contour_offsets, contour_ranks = ordering_ranks(ordering)
+    n = len(order)
 
-    # The following dicts map a node to an integer
-    delta_x = {}
-    y_coordinate = {}
+    # The following lists map the rank of a node to the rank of another node
+    # UNDEFINED means that the corresponding subtree does not exist
+    left_t_child = [UNDEFINED] * n
+    right_t_child = [UNDEFINED] * n
 
-    node_list = get_canonical_ordering(g)
+    # The following lists map the rank of a node to an integer
+    delta_x = [0] * n
+    y_coordinate = [0] * n
 
     # 1. Phase: Compute relative positions
 
-    # Initialization
-    v1, v2, v3 = node_list[0][0], node_list[1][0], node_list[2][0]
-
-    delta_x[v1] = 0
-    y_coordinate[v1] = 0
-    right_t_child[v1] = v3
-    left_t_child[v1] = None
-
-    delta_x[v2] = 1
-    y_coordinate[v2] = 0
-    right_t_child[v2] = None
-    left_t_child[v2] = None
-
-    delta_x[v3] = 1
-    y_coordinate[v3] = 1
-    right_t_child[v3] = v2
-    left_t_child[v3] = None
+    # Initialization, v1, v2, v3 have ranks 0, 1, 2
+    right_t_child[0] = 2
+    delta_x[1] = 1
+    delta_x[2] = 1
+    y_coordinate[2] = 1
+    right_t_child[2] = 1
 
-    for k in range(3, len(node_list)):
-        vk, contour_neighbors = node_list[k]
-        wp = contour_neighbors[0]
-        wp1 = contour_neighbors[1]
-        wq = contour_neighbors[-1]
-        wq1 = contour_neighbors[-2]
-        adds_mult_tri = len(contour_neighbors) > 2
+    for k in range(3, n):
+        begin, end = contour_offsets[k], contour_offsets[k + 1]
+        wp = contour_ranks[begin]
+        wp1 = contour_ranks[begin + 1]
+        wq = contour_ranks[end - 1]
+        adds_mult_tri = end - begin > 2
 
         # Stretch gaps:
         delta_x[wp1] += 1
         delta_x[wq] += 1
 
-        delta_x_wp_wq = sum(delta_x[x] for x in contour_neighbors[1:])
+        # Offset of wq from wp, the contour vertices wp+1, ..., wq hang on their contour predecessor
+        delta_x_wp_wq = 0
+        for i in range(begin + 1, end):
+            delta_x_wp_wq += delta_x[contour_ranks[i]]
 
         # Adjust offsets
-        delta_x[vk] = (-y_coordinate[wp] + delta_x_wp_wq + y_coordinate[wq]) // 2
-        y_coordinate[vk] = (y_coordinate[wp] + delta_x_wp_wq + y_coordinate[wq]) // 2
-        delta_x[wq] = delta_x_wp_wq - delta_x[vk]
+        delta_x_vk = (-y_coordinate[wp] + delta_x_wp_wq + y_coordinate[wq]) // 2
+        delta_x[k] = delta_x_vk
+        y_coordinate[k] = (y_coordinate[wp] + delta_x_wp_wq + y_coordinate[wq]) // 2
+        delta_x[wq] = delta_x_wp_wq - delta_x_vk
         if adds_mult_tri:
-            delta_x[wp1] -= delta_x[vk]
+            delta_x[wp1] -= delta_x_vk
 
         # Install v_k:
-        right_t_child[wp] = vk
-        right_t_child[vk] = wq
+        right_t_child[wp] = k
+        right_t_child[k] = wq
         if adds_mult_tri:
-            left_t_child[vk] = wp1
-            right_t_child[wq1] = None
-        else:
-            left_t_child[vk] = None
+            left_t_child[k] = wp1
+            right_t_child[contour_ranks[end - 2]] = UNDEFINED
 
     # 2. Phase: Set absolute positions
-    pos = dict()
-    pos[v1] = (0, y_coordinate[v1])
-    remaining_nodes = [v1]
-    while remaining_nodes:
-        parent_node = remaining_nodes.pop()
-
-        # Calculate position for left child
-        set_position(
-            parent_node, left_t_child, remaining_nodes, delta_x, y_coordinate, pos
-        )
-        # Calculate position for right child
-        set_position(
-            parent_node, right_t_child, remaining_nodes, delta_x, y_coordinate, pos
-        )
-    return pos
-
-
-
-def set_position(parent, tree, remaining_nodes, delta_x, y_coordinate, pos):
-    """Helper method to calculate the absolute position of nodes."""
-    child = tree[parent]
-    parent_node_x = pos[parent][0]
-    if child is not None:
-        # Calculate pos of child
-        child_x = parent_node_x + delta_x[child]
-        pos[child] = (child_x, y_coordinate[child])
-        # Remember to calculate pos of its children
-        remaining_nodes.append(child)
+    x = absolute_x(np.array(delta_x, dtype=np.int64), np.array(left_t_child, dtype=np.int64),
+                   np.array(right_t_child, dtype=np.int64))
+    if isinstance(ordering, CanonicalOrdering):
+        return CoordinateStore.from_arrays(len(ordering.rank), order, x, y_coordinate)
+    return dict(zip(order, zip(x.tolist(), y_coordinate)))
+
+
+# order (v_k by rank k), contour offsets and contour neighbours of v_k given by their ranks, as lists:
+# the contour neighbours of v_k are contour_ranks[contour_offsets[k]:contour_offsets[k + 1]]
+def ordering_ranks(ordering):
+    if isinstance(ordering, CanonicalOrdering):
+        return (ordering.order, ordering.contour_offsets.tolist(),
+                ordering.rank[ordering.contour_nodes].tolist())
+
+    order = [v for v, _ in ordering]
+    rank = dict((v, k) for k, v in enumerate(order))
+    contour_offsets = [0]
+    contour_ranks = []
+    for _, contour_neighbors in ordering:
+        contour_ranks.extend(rank[w] for w in contour_neighbors)
+        contour_offsets.append(len(contour_ranks))
+    return order, contour_offsets, contour_ranks
+
+
+# Absolute x of every node of the tree given by left_t_child / right_t_child (arrays indexed by rank),
+# x of a node is the sum of delta_x on its path from the root. Pointer jumping: every round each node adds
+# the sum of its ancestor and jumps to the ancestor's ancestor, so O(log depth) vectorised rounds.
+def absolute_x(delta_x, left_t_child, right_t_child):
+    ancestor = np.full(len(delta_x), UNDEFINED, dtype=np.int64)
+    for tree in (left_t_child, right_t_child):
+        parents = np.flatnonzero(tree != UNDEFINED)
+        ancestor[tree[parents]] = parents
+
+    x = delta_x.copy()
+    nodes = np.flatnonzero(ancestor != UNDEFINED)
+    while len(nodes) > 0:
+        up = ancestor[nodes]
+        x[nodes] += x[up]
+        ancestor[nodes] = ancestor[up]
+        nodes = nodes[ancestor[nodes] != UNDEFINED]
+    return x
@@ -0,0 +1,110 @@
+from coordinates import CoordinateStore, shift_frame
+
+
+class RelativeShiftEngine:
+    # Shift engine that keeps x-coordinates relative to the parent in a contour tree,
+    # the same way combinatorial_embedding_to_pos in shift_algorithm does with delta_x / right_t_child.
+    # Contour vertices hang on the right child of their contour predecessor, vertices covered by v_k hang
+    # on the left child of v_k, so the subtree of a contour vertex c is exactly U(c). Shifting every
+    # U-set from wq to the end of the contour is then one increment of delta_x[wq].
+    # Absolute positions are only resolved in positions().
+
+    def __init__(self, ordering):
+        self.left_t_child = dict()
+        self.right_t_child = dict()
+        self.delta_x = dict()
+        self.y_coordinate = dict()
+        # Positions of the contour run around the vertex currently being placed, see frame()
+        self.frame_pos = dict()
+
+        v1, v2, v3 = ordering.vertex(0), ordering.vertex(1), ordering.vertex(2)
+        self.root = v1
+        self.size = len(ordering.rank)
+
+        # Same initial drawing as GraphDrawingAlgorithm.set_inital_pos, a triangle alone is drawn as
+        # (0, 0), (1, 0), (0, 1) with v3 above v1
+        triangle = len(ordering) == 3
+        self.delta_x[v1] = 0
+        self.y_coordinate[v1] = 0
+        self.right_t_child[v1] = v3
+        self.left_t_child[v1] = None
+
+        self.delta_x[v3] = 0 if triangle else 1
+        self.y_coordinate[v3] = 1
+        self.right_t_child[v3] = v2
+        self.left_t_child[v3] = None
+
+        self.delta_x[v2] = 1
+        self.y_coordinate[v2] = 0
+        self.right_t_child[v2] = None
+        self.left_t_child[v2] = None
+
+    # Positions of consecutive contour vertices (nodes) with x relative to anchor.
+    # Costs O(len(nodes)), the placement step only needs the run between wp and wq.
+    def frame(self, nodes, anchor):
+        self.frame_pos = dict()
+        x = 0
+        for i, v in enumerate(nodes):
+            if i > 0:
+                x += self.delta_x[v]
+            self.frame_pos[v] = (x, self.y_coordinate[v])
+
+        x_anchor = self.frame_pos[anchor][0]
+        if x_anchor != 0:
+            for v, (x, y) in self.frame_pos.items():
+                self.frame_pos[v] = (x - x_anchor, y)
+        return self.frame_pos
+
+    # Shifts U-sets of w and of every contour vertex right of w by one.
+    def shift(self, w):
+        self.delta_x[w] += 1
+
+        # Keep the current frame in sync, vertices of the frame right of w are moved as well
+        shift_frame(self.frame_pos, w)
+
+    # Installs v_k at (x_k, y_k), given in the current frame, on top of its contour neighbours wp, ..., wq.
+    def place(self, v_k, contour_neighbors, x_k, y_k):
+        wp = contour_neighbors[0]
+        wp1 = contour_neighbors[1]
+        wq = contour_neighbors[-1]
+        wq1 = contour_neighbors[-2]
+
+        self.delta_x[v_k] = x_k - self.frame_pos[wp][0]
+        self.y_coordinate[v_k] = y_k
+        self.delta_x[wq] = self.frame_pos[wq][0] - x_k
+
+        self.right_t_child[wp] = v_k
+        self.right_t_child[v_k] = wq
+        if len(contour_neighbors) > 2:
+            # Covered vertices wp+1, ..., wq-1 move under v_k
+            self.delta_x[wp1] = self.frame_pos[wp1][0] - x_k
+            self.left_t_child[v_k] = wp1
+            self.right_t_child[wq1] = None
+        else:
+            self.left_t_child[v_k] = None
+
+        self.frame_pos[v_k] = (x_k, y_k)
+
+    # Absolute position of contour vertex v, contour vertices hang on their left neighbour on the contour.
+    def contour_position(self, contour, v):
+        x = 0
+        for w in contour:
+            x += self.delta_x[w]
+            if w == v:
+                return x, self.y_coordinate[v]
+        raise KeyError(v)
+
+    # Resolves absolute positions of every placed vertex in one pass over the contour tree, as CoordinateStore.
+    def positions(self):
+        x = {self.root: self.delta_x[self.root]}
+        remaining_nodes = [self.root]
+        while remaining_nodes:
+            parent = remaining_nodes.pop()
+            for tree in (self.left_t_child, self.right_t_child):
+                child = tree[parent]
+                if child is not None:
+                    x[child] = x[parent] + self.delta_x[child]
+                    remaining_nodes.append(child)
+        nodes = list(x)
+        return CoordinateStore.from_arrays(self.size, nodes, list(x.values()),
+                                           [self.y_coordinate[v] for v in nodes])
@@ -0,0 +1,94 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+
+# Rendering snapshots of G_k during a run in background processes, so the algorithm loop does not wait for
+# matplotlib. Snapshots are the resolved positions after v_k was inserted, sent to a pool of workers through
+# a bounded queue: when queue_size snapshots are waiting, submit blocks until the oldest one is rendered.
+# Every worker draws into one figure it keeps for all its snapshots. matplotlib is only imported by the workers
+# and PIL by close(), so importing this module for graph_of_step loads no plotting code.
+
+# Ordering and figure of a worker process, set by init_worker
+worker_ordering = None
+worker_figure = None
+
+
+def init_worker(ordering):
+    global worker_ordering, worker_figure
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    worker_ordering = ordering
+    worker_figure = plt.figure()
+
+
+# G_k, v_1, ..., v_k with edges to their contour neighbours, the same graph run() used to build step by step
+def graph_of_step(ordering, k):
+    g = nx.Graph()
+    g.add_edge(ordering[0][0], ordering[1][0])
+    for i in range(2, k + 1):
+        v, neighbours = ordering[i]
+        for w in neighbours:
+            g.add_edge(v, w)
+    return g
+
+
+def render_step(k, pos, path):
+    import io_graph_functions
+    g = graph_of_step(worker_ordering, k)
+    io_graph_functions.save_graph_pic_to_figure(worker_figure, g, path, pos=pos.to_dict())
+    return path
+
+
+class StepRenderer:
+    # directory      - where snapshots adding_{k}_{vk}.png are written
+    # every          - only every `every`th insertion is rendered, the last one always
+    # workers        - number of rendering processes
+    # queue_size     - snapshots waiting for a worker before submit blocks
+    # animation_path - GIF of all rendered snapshots, written by close()
+
+    def __init__(self, directory, every=1, workers=1, queue_size=8, animation_path=None, frame_duration=200):
+        self.directory = directory
+        self.every = every
+        self.workers = workers
+        self.queue_size = queue_size
+        self.animation_path = animation_path
+        self.frame_duration = frame_duration
+        self.executor = None
+        self.pending = deque()
+        self.frames = []
+        self.last_k = None
+
+    def start(self, ordering):
+        self.last_k = len(ordering) - 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker, initargs=(ordering,))
+
+    # Whether snapshot after kth insertion is rendered, checked before positions are resolved
+    def wants(self, k):
+        return k % self.every == 0 or k == self.last_k
+
+    def submit(self, k, vk, pos):
+        while len(self.pending) >= self.queue_size:
+            self.pending.popleft().result()
+
+        path = os.path.join(self.directory, 'adding_{k}_{vk}.png'.format(k=k, vk=vk))
+        self.pending.append(self.executor.submit(render_step, k, pos, path))
+        self.frames.append(path)
+
+    # Waiting for all snapshots and writing the animation
+    def close(self):
+        while self.pending:
+            self.pending.popleft().result()
+        self.executor.shutdown()
+
+        if self.animation_path is not None and self.frames:
+            from PIL import Image
+            images = [Image.open(path) for path in self.frames]
+            try:
+                images[0].save(self.animation_path, save_all=True, append_images=images[1:],
+                               duration=self.frame_duration, loop=0)
+            finally:
+                for image in images:
+                    image.close()
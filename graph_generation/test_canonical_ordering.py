@@ -0,0 +1,84 @@
+import networkx as nx
+import pytest
+
+import instances_preliminaries
+from canonical_ordering import CanonicalOrdering
+from drawing_validation import find_violation
+from errors import CanonicalOrderingError
+from graph_algorithms import AAlgorithm, BAlgorithm
+from shift_algorithm import combinatorial_embedding_to_pos
+
+# Graphs with other than integer nodes (strings) get a canonical ordering as list of tuples, and the same drawings
+# as the graph with integer nodes they were relabelled from.
+
+
+def label(v):
+    return 'v{v}'.format(v=v)
+
+
+def string_triangulation(n, seed):
+    g = instances_preliminaries.generate_triangulated_graph(n, seed)
+    return g, nx.relabel_nodes(g, label)
+
+
+def relabelled(ordering):
+    return [(label(v), [label(w) for w in wp_wq]) for v, wp_wq in ordering]
+
+
+def test_inner_canonical_ordering_of_string_nodes():
+    g, h = string_triangulation(40, 1)
+    _, embedding = nx.check_planarity(g)
+    _, string_embedding = nx.check_planarity(h)
+
+    ordering = instances_preliminaries.inner_get_canonical_ordering(embedding, [1, 2, 40])
+    string_ordering = instances_preliminaries.inner_get_canonical_ordering(string_embedding, ['v1', 'v2', 'v40'])
+    assert isinstance(ordering, CanonicalOrdering)
+    assert isinstance(string_ordering, list)
+
+    # Nodes are picked in set order, which differs between strings and integers, so the orderings may differ
+    assert [v for v, _ in string_ordering[:2]] == ['v1', 'v2'] and string_ordering[-1][0] == 'v40'
+    assert sorted(v for v, _ in string_ordering) == sorted(h)
+    assert find_violation(h, combinatorial_embedding_to_pos(h, string_ordering)) is None
+
+
+def test_drawings_of_string_nodes():
+    g, h = string_triangulation(40, 2)
+    ordering = instances_preliminaries.get_canonical_ordering(g)
+    string_ordering = relabelled(ordering)
+
+    for algorithm in (AAlgorithm, BAlgorithm):
+        pos = algorithm().run(g)
+        string_pos = algorithm().run(h, ordering=string_ordering)
+        assert string_pos == dict((label(v), position) for v, position in pos.items())
+
+    pos = combinatorial_embedding_to_pos(g)
+    string_pos = combinatorial_embedding_to_pos(h, string_ordering)
+    assert string_pos == dict((label(v), position) for v, position in pos.items())
+
+
+def test_fast_canonical_ordering_falls_back_for_string_nodes():
+    g, h = string_triangulation(40, 3)
+    _, string_embedding = nx.check_planarity(h)
+    outer_face = ['v1', 'v2', 'v40']
+
+    string_ordering = instances_preliminaries.fast_canonical_ordering(string_embedding, outer_face)
+    assert string_ordering == instances_preliminaries.inner_get_canonical_ordering(string_embedding, outer_face)
+
+    # Prepared instance with its outer face goes the same way, the drawings are planar
+    instance = instances_preliminaries.PreparedInstance(h, outer_face)
+    assert instance.ordering == string_ordering
+    for algorithm in (AAlgorithm, BAlgorithm):
+        pos = algorithm().run(instance)
+        assert sorted(pos) == sorted(h)
+    assert find_violation(h, combinatorial_embedding_to_pos(instance)) is None
+
+
+# Invalid inputs raise instead of walking around a vertex forever
+def test_canonical_ordering_of_invalid_inputs_raises():
+    grid = nx.convert_node_labels_to_integers(nx.grid_2d_graph(3, 3), first_label=1)
+    with pytest.raises(CanonicalOrderingError):
+        instances_preliminaries.PreparedInstance(grid).ordering
+
+    g = instances_preliminaries.generate_triangulated_graph(30, 1)
+    with pytest.raises(CanonicalOrderingError):
+        instances_preliminaries.PreparedInstance(g, [1, 2, 5]).ordering
@@ -0,0 +1,73 @@
+import numpy as np
+
+UNDEFINED = -1
+
+
+class USetForest:
+    # U-sets as a forest: every vertex points to the vertex v_k that covered it, so
+    # U(v) = v and all its descendants and no vertex is ever copied into another set.
+    # Children are kept as first child / next sibling in contour order, members() iterates
+    # in the same order as the old lists [v_k] + U(w_p+1) + ... + U(w_q-1).
+    # shift(v) moves the whole U(v) by one record, offset[v] holds pending shifts of the descendants
+    # of v, applied in one pass by resolve().
+
+    def __init__(self, size):
+        self.parent = [UNDEFINED] * size
+        self.first_child = [UNDEFINED] * size
+        self.next_sibling = [UNDEFINED] * size
+        self.offset = np.zeros(size, dtype=np.int64)
+        self.nodes = []
+
+    # Adding v_k, covered are the inner contour neighbours w_p+1, ..., w_q-1 it absorbs
+    def add(self, v, covered=()):
+        for c in reversed(covered):
+            self.parent[c] = v
+            self.next_sibling[c] = self.first_child[v]
+            self.first_child[v] = c
+        self.nodes.append(v)
+
+    # Lazy iteration over U(v)
+    def members(self, v):
+        stack = [v]
+        while stack:
+            t = stack.pop()
+            yield t
+            c = self.first_child[t]
+            children = []
+            while c != UNDEFINED:
+                children.append(c)
+                c = self.next_sibling[c]
+            stack.extend(reversed(children))
+
+    # Shifting descendants of v by one, v itself is moved by the caller.
+    # v can also be an array of distinct vertices.
+    def shift(self, v):
+        self.offset[v] += 1
+
+    # Absolute positions, pos (CoordinateStore) holds the placed vertices without the pending shifts of
+    # their ancestors. Vertices are added in canonical order, so every parent is visited before its children.
+    def resolve(self, pos):
+        offset = self.offset.tolist()
+        total = [0] * len(offset)
+        for v in reversed(self.nodes):
+            p = self.parent[v]
+            if p != UNDEFINED:
+                total[v] = total[p] + offset[p]
+        return pos.shifted(total)
+
+    # Dict-of-lists view for debugging
+    def items(self):
+        for v in self.nodes:
+            yield v, list(self.members(v))
+
+    def keys(self):
+        return iter(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __getitem__(self, v):
+        return list(self.members(v))
+
+    def __len__(self):
+        return len(self.nodes)
@@ -0,0 +1,101 @@
+from errors import VisibilityError
+
+# Exact visibility queries on the integer grid.
+# Positions are (x, y) tuples of ints, nothing here uses floating point.
+
+
+# Orientation of the triple (a, b, c): > 0 counter-clockwise, < 0 clockwise, 0 collinear.
+def orientation(a, b, c):
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+# Point c lies on the closed segment [a, b], given that a, b and c are collinear.
+def on_segment(a, b, c):
+    return min(a[0], b[0]) <= c[0] <= max(a[0], b[0]) and min(a[1], b[1]) <= c[1] <= max(a[1], b[1])
+
+
+# Closed segments [a, b] and [c, d] have a common point (same predicate as shapely's LineString.intersects).
+def segments_intersect(a, b, c, d):
+    o1 = orientation(a, b, c)
+    o2 = orientation(a, b, d)
+    o3 = orientation(c, d, a)
+    o4 = orientation(c, d, b)
+
+    if ((o1 > 0 and o2 < 0) or (o1 < 0 and o2 > 0)) and ((o3 > 0 and o4 < 0) or (o3 < 0 and o4 > 0)):
+        return True
+
+    return (o1 == 0 and on_segment(a, b, c)) or (o2 == 0 and on_segment(a, b, d)) or \
+        (o3 == 0 and on_segment(c, d, a)) or (o4 == 0 and on_segment(c, d, b))
+
+
+# Smallest integer strictly greater than num / den, den > 0.
+def above(num, den):
+    return num // den + 1
+
+
+# Lower bound for y of a point (x_k, y) that sees every point of chain with x > x_k.
+# chain is ordered by non-decreasing x. Points are processed left to right while the upper hull
+# (Andrew's monotone chain) of the points between x_k and the current point is kept, the top of the
+# hull after popping is the tangent point, the steepest obstacle for the current point.
+# Every point is pushed and popped at most once, so the whole pass is O(len(chain)).
+def right_visibility_bound(x_k, chain):
+    bound = None
+    hull = []
+    i = 0
+    while i < len(chain):
+        x_i = chain[i][0]
+        if x_i <= x_k:
+            i += 1
+            continue
+
+        # Points of the same column are queried against the hull of the columns left of it
+        j = i
+        while j < len(chain) and chain[j][0] == x_i:
+            c = chain[j]
+            if j > i and chain[j - 1][1] > c[1]:
+                # A point of the same column above c hides c from the left
+                raise VisibilityError('point {c} is hidden by {h}'.format(c=c, h=chain[j - 1]))
+
+            while len(hull) >= 2 and orientation(hull[-2], hull[-1], c) >= 0:
+                hull.pop()
+            if hull:
+                h = hull[-1]
+                # Line through c and h evaluated at x_k, the point has to be strictly above it
+                y = above(h[1] * (c[0] - x_k) - c[1] * (h[0] - x_k), c[0] - h[0])
+                bound = y if bound is None else max(bound, y)
+            j += 1
+
+        for c in chain[i:j]:
+            while len(hull) >= 2 and orientation(hull[-2], hull[-1], c) >= 0:
+                hull.pop()
+            hull.append(c)
+        i = j
+    return bound
+
+
+# Lower bound for y so that (x_k, y) is strictly above the chain in column x_k.
+def column_bound(x_k, chain):
+    bound = None
+    for i in range(len(chain)):
+        x, y = chain[i]
+        if x == x_k:
+            y = y + 1
+        elif i + 1 < len(chain) and x < x_k < chain[i + 1][0]:
+            x1, y1 = chain[i + 1]
+            y = above(y * (x1 - x_k) + y1 * (x_k - x), x1 - x)
+        else:
+            continue
+        bound = y if bound is None else max(bound, y)
+    return bound
+
+
+# Minimum y >= begin_y such that point (x_k, y) sees every vertex of chain.
+# chain are the positions of contour neighbours wp, ..., wq in contour order, x-monotone.
+# A vertex w_i is seen if segment (x_k, y) - w_i does not touch any contour segment not incident to w_i.
+# The point has to be above the contour in its column and above the tangent from every w_i to the upper
+# envelope of the contour between x_k and w_i, vertices left of x_k are handled by mirroring the chain.
+def min_visible_y(x_k, begin_y, chain):
+    mirrored = [(-x, y) for x, y in reversed(chain)]
+    bounds = [begin_y, column_bound(x_k, chain), right_visibility_bound(x_k, chain),
+              right_visibility_bound(-x_k, mirrored)]
+    return max(b for b in bounds if b is not None)